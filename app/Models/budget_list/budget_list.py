@@ -1,6 +1,7 @@
-from typing import Optional
-from pydantic import BaseModel, Field
-from datetime import datetime
+from typing import List, Optional
+from fastapi import HTTPException
+from pydantic import BaseModel, Field, field_validator
+from datetime import datetime, date
 
 from enum import Enum
 
@@ -49,6 +50,16 @@ class BudgetListUpdate(BaseModel):
         currency_value: Optional[float] = None
         wallet_id: Optional[int] = None
 
+        @field_validator('date')
+        def validate_date(cls, v: Optional[datetime]) -> datetime:
+            # поле можно не передавать, но не обнулять: дата обязательна для записи (и ключ партиции)
+            if v is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Дата не может быть пустой"
+                )
+            return v
+
         class Config:
             from_attributes = True
 
@@ -65,4 +76,73 @@ class BudgetListResponse(BaseModel):
     wallet_id: Optional[int] = None
     type_budget: str
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class BudgetListFilter(BaseModel):
+    date_from: Optional[date] = Field(None, description="Начальная дата")
+    date_to: Optional[date] = Field(None, description="Конечная дата")
+    wallet_id: Optional[int] = Field(None, description="ID кошелька")
+    type_id: Optional[int] = Field(None, description="ID типа")
+    currency: Optional[int] = Field(None, description="ID валюты")
+    value_min: Optional[float] = Field(None, description="Минимальная сумма")
+    value_max: Optional[float] = Field(None, description="Максимальная сумма")
+
+
+class SummaryPeriod(str, Enum):
+    DAY = "day"
+    MONTH = "month"
+
+
+class BudgetSummaryResponse(BaseModel):
+    period_start: date
+    wallet_id: Optional[int] = None
+    type_id: Optional[int] = None
+    total: float
+    count: int
+
+    class Config:
+        from_attributes = True
+
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class ImportResponse(BaseModel):
+    imported: int
+    skipped: int
+
+
+class BudgetBatchRequest(BaseModel):
+    create: List[BudgetListCreate] = Field(default_factory=list, max_length=500)
+    delete: List[int] = Field(default_factory=list, max_length=500)
+
+
+class BatchItemStatus(str, Enum):
+    CREATED = "created"
+    DELETED = "deleted"
+    ERROR = "error"
+
+
+class BatchItemResult(BaseModel):
+    operation: str
+    index: int
+    id: Optional[int] = None
+    status: BatchItemStatus
+    detail: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    items: List[BatchItemResult]
+
+
+class BudgetSearchItem(BudgetListResponse):
+    rank: float
+
+
+class BudgetSearchResponse(BaseModel):
+    data: List[BudgetSearchItem]
+    next_cursor: Optional[str] = None
@@ -1,14 +1,30 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Float, Integer, DateTime, ForeignKey, Text
+from sqlalchemy import String, Float, Integer, DateTime, ForeignKey, Text, Index, Computed, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from typing import Optional
 from datetime import datetime
 
 from app.Models.base_model_type.base_model_type import BaseType
 from app.database.base import Base
 
+SEARCH_VECTOR_SQL = (
+    "to_tsvector('simple'::regconfig, "
+    "coalesce(name, '') || ' ' || coalesce(description, '') || ' ' || coalesce(content, ''))"
+)
+
 
 class BudgetList(Base):
     __tablename__ = "budget_list"
+    __table_args__ = (
+        # повторный и параллельный импорт не создают дублей; date - ключ партиции, а в самом хэше она уже есть
+        Index("uq_budget_list_user_content_hash", "user_id", "content_hash", "date",
+              unique=True, postgresql_where=text("content_hash IS NOT NULL")),
+        # списки по пользователю и виду записи: фильтр по дате, кошельку или типу и сортировка по дате
+        Index("ix_budget_list_user_kind_date", "user_id", "type_budget", "date", "id"),
+        Index("ix_budget_list_user_kind_wallet_date", "user_id", "type_budget", "wallet_id", "date"),
+        Index("ix_budget_list_user_kind_type_date", "user_id", "type_budget", "type_id", "date"),
+        Index("ix_budget_list_user_search", "user_id", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     date: Mapped[datetime] = mapped_column(DateTime(timezone=True))
@@ -22,5 +38,13 @@ class BudgetList(Base):
     type_id: Mapped[Optional[int]] = mapped_column(ForeignKey("base_types.id"), nullable=True)
     currency_value: Mapped[Optional[float]] = mapped_column(Float)
     wallet_id: Mapped[int] = mapped_column(ForeignKey("wallet.id"), nullable=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    # считается самим Postgres, в обычных запросах не загружается
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed(SEARCH_VECTOR_SQL, persisted=True),
+        nullable=True,
+        deferred=True
+    )
 
     type: Mapped[Optional["BaseType"]] = relationship()
@@ -0,0 +1,33 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Float, Integer, DateTime, Text, Index
+from typing import Optional
+from datetime import datetime
+
+from app.database.base import Base
+
+
+class BudgetListArchive(Base):
+    """
+    Старые записи budget_list. Колонки те же, id сохраняются; внешних ключей и поискового вектора нет,
+    индекс один - под списки и экспорт.
+    Текстовые колонки хранятся сжатыми (lz4, если сервер его поддерживает, иначе pglz) у строк длиннее
+    toast_tuple_target = 128 байт, см. init_db.
+    """
+    __tablename__ = "budget_list_archive"
+    __table_args__ = (
+        Index("ix_budget_list_archive_user_kind_date", "user_id", "type_budget", "date", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    date: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    name: Mapped[str] = mapped_column(String(200))
+    value: Mapped[float] = mapped_column(Float)
+    currency: Mapped[int] = mapped_column(Integer, nullable=True)
+    description: Mapped[str] = mapped_column(Text)
+    type_budget: Mapped[str] = mapped_column(Text)
+    content: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    user_id: Mapped[int] = mapped_column(Integer)
+    type_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    currency_value: Mapped[Optional[float]] = mapped_column(Float)
+    wallet_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
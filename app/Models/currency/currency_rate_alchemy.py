@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from sqlalchemy import String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class CurrencyRateAlchemy(Base):
+    __tablename__ = "currency_rate"
+
+    source: Mapped[str] = mapped_column(String(3), primary_key=True)
+    target: Mapped[str] = mapped_column(String(3), primary_key=True)
+    value: Mapped[float]
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
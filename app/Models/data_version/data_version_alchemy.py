@@ -0,0 +1,12 @@
+from sqlalchemy import String, BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class DataVersion(Base):
+    __tablename__ = "data_version"
+
+    scope: Mapped[str] = mapped_column(String(20), primary_key=True)
+    user_id: Mapped[int] = mapped_column(primary_key=True, default=0)
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
@@ -0,0 +1,19 @@
+from sqlalchemy import BigInteger, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class DataVersionEvent(Base):
+    """
+    Журнал изменений данных: каждая запись добавляет строку, компактор переносит их количество
+    в data_version. Версия scope - data_version.version плюс число его строк в журнале.
+    """
+    __tablename__ = "data_version_event"
+    __table_args__ = (
+        Index("ix_data_version_event_scope_user", "scope", "user_id"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    scope: Mapped[str] = mapped_column(String(20))
+    user_id: Mapped[int] = mapped_column(default=0)
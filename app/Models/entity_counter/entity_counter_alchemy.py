@@ -0,0 +1,13 @@
+from sqlalchemy import String, BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class EntityCounter(Base):
+    __tablename__ = "entity_counter"
+
+    user_id: Mapped[int] = mapped_column(primary_key=True)
+    entity: Mapped[str] = mapped_column(String(50), primary_key=True)
+    type_budget: Mapped[str] = mapped_column(String(20), primary_key=True, default='')
+    total: Mapped[int] = mapped_column(BigInteger, default=0)
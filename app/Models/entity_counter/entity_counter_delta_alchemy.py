@@ -0,0 +1,21 @@
+from sqlalchemy import String, BigInteger, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class EntityCounterDelta(Base):
+    """
+    Журнал изменений счетчиков в режиме WALLET_LEDGER_MODE: запись добавляет строку,
+    компактор переносит суммы в entity_counter.
+    """
+    __tablename__ = "entity_counter_delta"
+    __table_args__ = (
+        Index("ix_entity_counter_delta_entity_user", "entity", "user_id", "type_budget"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    user_id: Mapped[int] = mapped_column()
+    entity: Mapped[str] = mapped_column(String(50))
+    type_budget: Mapped[str] = mapped_column(String(20), default='')
+    delta: Mapped[int] = mapped_column(BigInteger)
@@ -0,0 +1,19 @@
+from datetime import date
+
+from sqlalchemy import String, Date, Float, BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class LedgerRollup(Base):
+    __tablename__ = "ledger_rollup"
+
+    user_id: Mapped[int] = mapped_column(primary_key=True)
+    wallet_id: Mapped[int] = mapped_column(primary_key=True, default=0)
+    type_budget: Mapped[str] = mapped_column(String(20), primary_key=True)
+    type_id: Mapped[int] = mapped_column(primary_key=True, default=0)
+    period: Mapped[str] = mapped_column(String(10), primary_key=True)
+    period_start: Mapped[date] = mapped_column(Date, primary_key=True)
+    total: Mapped[float] = mapped_column(Float, default=0)
+    count: Mapped[int] = mapped_column(BigInteger, default=0)
@@ -0,0 +1,24 @@
+from datetime import date
+
+from sqlalchemy import String, Date, Float, BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class LedgerRollupDelta(Base):
+    """
+    Журнал изменений агрегатов в режиме WALLET_LEDGER_MODE: запись добавляет строки,
+    компактор переносит суммы в ledger_rollup.
+    """
+    __tablename__ = "ledger_rollup_delta"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    user_id: Mapped[int] = mapped_column(index=True)
+    wallet_id: Mapped[int] = mapped_column(default=0)
+    type_budget: Mapped[str] = mapped_column(String(20))
+    type_id: Mapped[int] = mapped_column(default=0)
+    period: Mapped[str] = mapped_column(String(10))
+    period_start: Mapped[date] = mapped_column(Date)
+    total: Mapped[float] = mapped_column(Float)
+    count: Mapped[int] = mapped_column(BigInteger)
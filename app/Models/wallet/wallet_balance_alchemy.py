@@ -0,0 +1,20 @@
+from datetime import date
+
+from sqlalchemy import Boolean, Date, Float, ForeignKey, Index, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class WalletBalanceDay(Base):
+    __tablename__ = "wallet_balance_day"
+    __table_args__ = (
+        Index("ix_wallet_balance_day_dirty", "wallet_id", "day", postgresql_where=text("dirty")),
+    )
+
+    wallet_id: Mapped[int] = mapped_column(ForeignKey("wallet.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    net: Mapped[float] = mapped_column(Float, default=0)
+    cumulative: Mapped[float] = mapped_column(Float, default=0)
+    # net изменился, cumulative этого и следующих дней еще не пересчитан
+    dirty: Mapped[bool] = mapped_column(Boolean, default=False)
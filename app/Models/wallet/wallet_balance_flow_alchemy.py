@@ -0,0 +1,22 @@
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, Float, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class WalletBalanceFlow(Base):
+    """
+    Журнал дневных движений кошелька: запись только добавляет строку, фоновый refresher
+    переносит суммы в wallet_balance_day и удаляет строки.
+    """
+    __tablename__ = "wallet_balance_flow"
+    __table_args__ = (
+        Index("ix_wallet_balance_flow_wallet_day", "wallet_id", "day"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    wallet_id: Mapped[int] = mapped_column(ForeignKey("wallet.id", ondelete="CASCADE"))
+    day: Mapped[date] = mapped_column(Date)
+    net: Mapped[float] = mapped_column(Float)
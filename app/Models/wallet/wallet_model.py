@@ -1,3 +1,4 @@
+from datetime import date
 from typing import Optional
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -38,4 +39,15 @@ class WalletResponse(WalletBase):
 class CurrencyApiData(BaseModel):
     success: bool
     source: str
-    value: float
\ No newline at end of file
+    value: float
+
+class WalletBalanceResponse(BaseModel):
+    wallet_id: int
+    date: date
+    balance: float
+
+
+class WalletBalancePoint(BaseModel):
+    date: date
+    net: float
+    balance: float
@@ -1,13 +1,12 @@
 from fastapi import APIRouter, Depends, Response, Request, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
 from app.database.database import get_db
 
-from app.Models.auth.user import User
-from app.helpers.auth.hashed_password import verify_password
+from app.helpers.auth.check_login import get_user_by_email
+from app.helpers.auth.hashed_password import verify_password_async
 from app.helpers.auth.set_cookie import set_cookie
-from app.helpers.auth.token import create_access_token, create_refresh_token
+from app.helpers.auth.token import create_access_token, create_refresh_token, user_token_data
 from app.Models.auth.auth_models import Login, LoginResponse
 
 router = APIRouter(prefix="/auth", tags=["Авторизация 🔓"])
@@ -19,9 +18,7 @@ async def login(
         response: Response,
         db: AsyncSession = Depends(get_db)
 ):
-    query = select(User).where(User.email == credential.email)
-    result = await db.execute(query)
-    user = result.scalar_one_or_none()
+    user = await get_user_by_email(db, credential.email)
 
     if not user:
         return LoginResponse(
@@ -30,19 +27,14 @@ async def login(
             access_token=None
         )
 
-    if not verify_password(credential.password, user.password):
+    if not await verify_password_async(credential.password, user.password):
         return LoginResponse(
             message="Неверный логин или пароль",
             refresh_token=None,
             access_token=None
         )
 
-    token_data = {
-        "id": user.id,
-        "email": user.email,
-        "name": user.name,
-        "isactive": user.isactive
-    }
+    token_data = user_token_data(user)
 
     refresh_token = create_refresh_token(token_data)
     access_token = create_access_token(token_data)
@@ -6,7 +6,8 @@ from sqlalchemy import select, cast
 from app.Models.auth.user import User
 from app.Models.role.role import Role
 from app.database.database import get_db
-from app.helpers.auth.hashed_password import hash_password, verify_password
+from app.helpers.auth.check_login import get_user_by_email
+from app.helpers.auth.hashed_password import hash_password_async, verify_password_async
 from app.Models.auth.auth_models import (
     RegisterResponse,
     ResetPasswordResponse,
@@ -14,9 +15,11 @@ from app.Models.auth.auth_models import (
     UserCreate,
     LoginResponse
 )
+from app.helpers.auth.principal import remember_role_version
+from app.helpers.auth.principal_cache import principal_cache
 from app.helpers.auth.remove_cookie import remove_cookie
 from app.helpers.auth.set_cookie import set_cookie
-from app.helpers.auth.token import decode_access_token, create_access_token, create_refresh_token
+from app.helpers.auth.token import REFRESH_TOKEN_TYPE, decode_access_token, create_access_token, create_refresh_token, user_token_data
 
 router = APIRouter(prefix="/auth", tags=["Регистрация 🪪"])
 
@@ -37,7 +40,7 @@ async def register(
             detail="Пользователь с таким email уже существует"
         )
 
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password_async(user.password)
     role_enum = ENUM('USER', 'ADMIN', name='role_enum', create_type=False)
 
     role_query = select(Role).where(Role.role == cast("USER", role_enum))
@@ -75,16 +78,17 @@ async def reset_password(
     if not user:
         return {"message": "Пользователь не найден"}
 
-    if not verify_password(pas.prev_password, user.password):
+    if not await verify_password_async(pas.prev_password, user.password):
         return {"message": "Старый пароль неверный"}
 
-    if verify_password(pas.new_password, user.password):
+    if await verify_password_async(pas.new_password, user.password):
         return {"message": "Пароль не может быть прежним"}
 
-    hashed_password = hash_password(pas.new_password)
+    hashed_password = await hash_password_async(pas.new_password)
     user.password = hashed_password
 
     await db.commit()
+    principal_cache.invalidate_user(user.id)
 
     return {"message": "Пароль успешно изменен"}
 
@@ -106,7 +110,7 @@ async def refresh_access_token(
             access_token=None
         )
 
-    decoded_token = decode_access_token(refresh_token)
+    decoded_token = decode_access_token(refresh_token, REFRESH_TOKEN_TYPE)
 
     if decoded_token is None:
         await remove_cookie(response)
@@ -116,11 +120,10 @@ async def refresh_access_token(
             access_token=None
         )
 
+    token_data = decoded_token
     email = decoded_token.get("email")
     if email:
-        query = select(User).where(User.email == email)
-        result = await db.execute(query)
-        user = result.scalar_one_or_none()
+        user = await get_user_by_email(db, email)
 
         if not user:
             await remove_cookie(response)
@@ -130,8 +133,11 @@ async def refresh_access_token(
                 access_token=None
             )
 
-    new_access_token = create_access_token(decoded_token)
-    new_refresh_token = create_refresh_token(decoded_token)
+        remember_role_version(user.id, user.role_version)
+        token_data = user_token_data(user)
+
+    new_access_token = create_access_token(token_data)
+    new_refresh_token = create_refresh_token(token_data)
 
     await set_cookie(response, new_access_token, new_refresh_token)
 
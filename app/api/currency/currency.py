@@ -6,20 +6,25 @@ from app.Models.currency.currency_alchemy import CurrencyAlchemy
 from app.Models.currency.currency_model import CurrencyRequest, CurrencyResponse, SortField, CurrencyUpdate
 from app.Models.other.enums import SortDirection
 from app.Models.other.meta_data import PaginatedResponse
+from app.api.deps import get_read_db
 from app.database.database import get_db
-from app.helpers.auth.check_login import get_current_user
+from app.helpers.auth.principal import get_principal
+from app.helpers.other.currency_catalog import currency_catalog
+from app.helpers.other.data_version import CURRENCY_SCOPE, bump_version, etag_guard
+from app.helpers.other.get_currency import quote_cache
 from app.helpers.other.meta_generator import meta_generator
 
-router_currency = APIRouter(prefix="/currency", tags=["Валюта 💴"], dependencies=[Depends(get_current_user)])
+router_currency = APIRouter(prefix="/currency", tags=["Валюта 💴"], dependencies=[Depends(get_principal)])
 
 
-@router_currency.get("", response_model=PaginatedResponse[CurrencyResponse], status_code=200, summary='Получить список валют 💸')
+@router_currency.get("", response_model=PaginatedResponse[CurrencyResponse], status_code=200, summary='Получить список валют 💸',
+                     dependencies=[Depends(etag_guard(shared_scopes=[CURRENCY_SCOPE]))])
 async def get_currencies(
         page: int = Query(1, description="Номер страницы"),
         per_page: int = Query(15, description="Элементов на странице"),
         sort_by: SortField = Query(SortField.ID, description="Поле для сортировки"),
         sort_direction: SortDirection = Query(SortDirection.ASC, description="Направление сортировки"),
-        db: AsyncSession = Depends(get_db)):
+        db: AsyncSession = Depends(get_read_db)):
     offset = (page - 1) * per_page
     sort_column = getattr(CurrencyAlchemy, sort_by.value)
     if sort_direction == SortDirection.ASC:
@@ -37,11 +42,14 @@ async def get_currencies(
 
 
 
+@router_currency.get("/cache/stats", status_code=200, summary='Статистика кэша курсов валют 📊')
+async def get_quote_cache_stats():
+    return quote_cache.stats()
+
+
 @router_currency.get("/{id}", response_model=CurrencyResponse, status_code=200, summary='Получить выбранную валюту 💸')
-async def get_currencies(id: int, db: AsyncSession = Depends(get_db)):
-    query = select(CurrencyAlchemy).where(CurrencyAlchemy.id == id)
-    result = await db.execute(query)
-    currency = result.scalar_one_or_none()
+async def get_currencies(id: int, db: AsyncSession = Depends(get_read_db)):
+    currency = await currency_catalog.get(db, id)
 
     if currency is None:
         raise HTTPException(status_code=404, detail="Данная валюта не найдена")
@@ -69,7 +77,9 @@ async def create_new_currency(
     )
 
     db.add(new_currency)
+    await bump_version(db, CURRENCY_SCOPE)
     await db.commit()
+    currency_catalog.invalidate()
     await db.refresh(new_currency)
 
     return new_currency
@@ -96,7 +106,9 @@ async def update_currency(
     for field, value in update_data_dict.items():
         setattr(currency, field, value)
 
+    await bump_version(db, CURRENCY_SCOPE)
     await db.commit()
+    currency_catalog.invalidate()
     await db.refresh(currency)
 
     return currency
@@ -112,6 +124,8 @@ async def delete_currency(id: int, db: AsyncSession = Depends(get_db)):
     if currency is None:
         raise HTTPException(status_code=404, detail="Данная валюта не найдена")
     await db.delete(currency)
+    await bump_version(db, CURRENCY_SCOPE)
     await db.commit()
+    currency_catalog.invalidate()
 
     return {"message": 'Валюта удалена'}
\ No newline at end of file
@@ -0,0 +1,29 @@
+from typing import Any, AsyncGenerator
+
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.database.database import AsyncSessionLocal, ReadSessionLocal
+from app.database.replica import LAST_WRITE_COOKIE, last_write_from_cookie, replica_router
+from app.helpers.auth.principal import Principal, get_principal
+
+
+async def get_read_session_factory(
+        request: Request,
+        principal: Principal = Depends(get_principal)
+) -> async_sessionmaker:
+    """
+    Фабрика сессий для GET-запроса: реплика, если replica_router разрешает, иначе основная база.
+    Недавняя запись учитывается и по cookie LAST_WRITE_COOKIE, выставленной другим воркером.
+    """
+    last_write_at = last_write_from_cookie(request.cookies.get(LAST_WRITE_COOKIE))
+    if replica_router.use_replica(principal.id, last_write_at):
+        return ReadSessionLocal
+    return AsyncSessionLocal
+
+
+async def get_read_db(
+        session_factory: async_sessionmaker = Depends(get_read_session_factory)
+) -> AsyncGenerator[Any, Any]:
+    async with session_factory() as session:
+        yield session
@@ -1,112 +1,90 @@
-from fastapi import APIRouter, Depends, Request, Query, Response, HTTPException
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.Models.budget_list.budget_list_alchemy import BudgetList
-from app.Models.expense_type.expense_type import ExpenseType
-from app.Models.income_types.income_types import IncomeType
 
 from app.Models.other.enums import SortDirection
 from app.Models.other.meta_data import PaginatedResponse
 from app.Models.wallet.wallet_model_alchemy import Wallet
+from app.api.deps import get_read_db, get_read_session_factory
 from app.database.database import get_db
 
-from app.Models.budget_list.budget_list import SortField, BudgetListResponse, BudgetListCreate, BudgetTypeResponse, \
-    BudgetListUpdate
-from app.helpers.auth.check_login import get_current_user
-from app.helpers.auth.check_role import check_is_admin_role
+from app.Models.budget_list.budget_list import SortField, BudgetListResponse, BudgetListCreate, \
+    BudgetListUpdate, BudgetListFilter, BudgetSummaryResponse, SummaryPeriod, ExportFormat, ImportResponse, \
+    BudgetBatchRequest, BatchResponse, BudgetSearchResponse
+from app.helpers.auth.principal import Principal, get_principal
+from app.helpers.budget_list.ledger_archive import ledger_source
+from app.helpers.budget_list.ledger_batch import apply_batch
+from app.helpers.budget_list.ledger_hooks import entry_snapshot, on_entry_created, on_entry_deleted, on_entry_updated
+from app.helpers.budget_list.ledger_export import EXPORT_MEDIA_TYPES, stream_ledger
+from app.helpers.budget_list.ledger_import import IMPORT_OPENAPI, import_entries, parse_import_body
+from app.helpers.budget_list.ledger_response import budget_responses
+from app.helpers.budget_list.ledger_rollup import read_summary
+from app.helpers.budget_list.ledger_search import search_entries
+from app.helpers.other.cursor_pagination import build_cursors, fetch_keyset_page, keyset_order
+from app.helpers.other.data_version import LEDGER_SCOPES, TYPES_SCOPE, etag_guard
 from app.helpers.other.get_currency import get_currency_one
 from app.helpers.other.meta_generator import meta_generator
+from app.helpers.other.type_catalog import type_catalog
 from app.helpers.update.check_fields import validate_foreign_keys
+from app.helpers.wallet.change_wallet_value import change_wallet_value
 
-router_income_list = APIRouter(prefix="/income", tags=["Доходы 💴"], dependencies=[Depends(get_current_user)])
+router_income_list = APIRouter(prefix="/income", tags=["Доходы 💴"], dependencies=[Depends(get_principal)])
+# ответы содержат названия типов, поэтому ETag зависит и от справочника типов
+ledger_etag = etag_guard('income', shared_scopes=[TYPES_SCOPE], admin_scopes=LEDGER_SCOPES)
 
 
 @router_income_list.get(
     '',
     response_model=PaginatedResponse[BudgetListResponse],
     status_code=200,
-    summary='Получить все доходы'
+    summary='Получить все доходы',
+    dependencies=[Depends(ledger_etag)]
 )
 async def income_list(
-        request: Request,
-        response: Response,
+        principal: Principal = Depends(get_principal),
         page: int = Query(1, ge=1, description="Номер страницы"),
         per_page: int = Query(15, ge=1, le=100, description="Элементов на странице"),
         sort_by: SortField = Query(SortField.ID, description="Поле для сортировки"),
         sort_direction: SortDirection = Query(SortDirection.ASC, description="Направление сортировки"),
-        db: AsyncSession = Depends(get_db)
+        cursor: Optional[str] = Query(None, description="Курсор страницы из next_cursor/prev_cursor, заменяет page"),
+        filters: BudgetListFilter = Depends(),
+        db: AsyncSession = Depends(get_read_db)
 ):
-    user = await get_current_user(request, response, db)
-    user_id = user.id
+    user_id = principal.id
     offset = (page - 1) * per_page
-    is_admin = await check_is_admin_role(request, response, db)
-
-    sort_column = getattr(BudgetList, sort_by.value)
-    if sort_direction == SortDirection.ASC:
-        sort_column = sort_column.asc()
-    else:
-        sort_column = sort_column.desc()
-
-    query = select(BudgetList)
+    is_admin = principal.is_admin
 
-    if not is_admin:
-        query = query.where(BudgetList.user_id == user_id, BudgetList.type_budget == 'income')
-
-    query = query.order_by(sort_column).offset(offset).limit(per_page)
-    pagination = await meta_generator(page, per_page, BudgetList, db)
-    result = await db.execute(query)
-    budgets = result.scalars().all()
+    query, ledger, total = await ledger_source(db, filters,
+                                               user_id=None if is_admin else user_id,
+                                               type_budget=None if is_admin else 'income')
 
-    type_ids = [b.type_id for b in budgets if b.type_id]
-    income_map = {}
-    expense_map = {}
+    pagination = await meta_generator(page, per_page, BudgetList, db, total=total)
 
-    if type_ids:
-        income_types = await db.execute(
-            select(IncomeType).where(IncomeType.id.in_(type_ids))
+    if cursor:
+        budgets, next_cursor, prev_cursor = await fetch_keyset_page(
+            db, query, ledger, sort_by.value, sort_direction, cursor, per_page
         )
-        income_map = {it.id: it for it in income_types.scalars().all()}
+        pagination.has_next = next_cursor is not None
+        pagination.has_prev = prev_cursor is not None
+    else:
+        sort_order = keyset_order(getattr(ledger, sort_by.value), ledger.id,
+                                  sort_direction == SortDirection.DESC)
+        query = query.order_by(*sort_order).offset(offset).limit(per_page)
+        result = await db.execute(query)
+        budgets = result.scalars().all()
+        next_cursor, prev_cursor = build_cursors(budgets, sort_by.value, sort_direction,
+                                                 pagination.has_next, pagination.has_prev)
 
-        expense_types = await db.execute(
-            select(ExpenseType).where(ExpenseType.id.in_(type_ids))
-        )
-        expense_map = {et.id: et for et in expense_types.scalars().all()}
-
-    budgets_list = []
-    for budget in budgets:
-        type_data = None
-        if budget.type_id:
-            if budget.type_budget == 'income' and budget.type_id in income_map:
-                inc = income_map[budget.type_id]
-                type_data = BudgetTypeResponse(
-                    id=inc.id,
-                    name=inc.name,
-                    description=inc.description or '',
-                    content=inc.content
-                )
-            elif budget.type_budget == 'expense' and budget.type_id in expense_map:
-                exp = expense_map[budget.type_id]
-                type_data = BudgetTypeResponse(
-                    id=exp.id,
-                    name=exp.name,
-                    description=exp.description or '',
-                    content=exp.content
-                )
-
-        budgets_list.append(BudgetListResponse(
-            id=budget.id,
-            date=budget.date,
-            name=budget.name,
-            value=budget.value,
-            currency=budget.currency,
-            description=budget.description,
-            content=budget.content,
-            type=type_data,
-            currency_value=budget.currency_value,
-            wallet_id=budget.wallet_id,
-            type_budget=budget.type_budget
-        ))
+    pagination.next_cursor = next_cursor
+    pagination.prev_cursor = prev_cursor
+
+    budgets_list = await budget_responses(db, budgets)
 
     return PaginatedResponse(
         data=budgets_list,
@@ -114,72 +92,82 @@ async def income_list(
     )
 
 
-@router_income_list.post("", response_model=BudgetListResponse, status_code=201, summary="Добавить доход 💶")
-async def create_budget(budget: BudgetListCreate,
-                        request: Request,
-                        response: Response,
-                        db: AsyncSession = Depends(get_db)
-                        ):
-    user = await get_current_user(request, response, db)
-    user_id = user.id
+@router_income_list.get("/summary", response_model=List[BudgetSummaryResponse], status_code=200,
+                        summary="Сводка доходов по периодам 📊")
+async def income_summary(
+        principal: Principal = Depends(get_principal),
+        period: SummaryPeriod = Query(SummaryPeriod.MONTH, description="Период агрегации"),
+        date_from: Optional[date] = Query(None, description="Начальная дата"),
+        date_to: Optional[date] = Query(None, description="Конечная дата"),
+        wallet_id: Optional[int] = Query(None, description="ID кошелька"),
+        db: AsyncSession = Depends(get_read_db)
+):
+    return await read_summary(db, principal.id, 'income', period.value, date_from, date_to, wallet_id)
 
-    wallet = select(Wallet).where(Wallet.user_id == user_id, Wallet.id == budget.wallet_id).with_for_update()
-    wallet_result = await db.execute(wallet)
-    wallet_res = wallet_result.scalar_one_or_none()
 
+@router_income_list.get("/export", status_code=200, summary="Экспорт доходов 📤")
+async def export_income(
+        principal: Principal = Depends(get_principal),
+        export_format: ExportFormat = Query(ExportFormat.CSV, alias="format", description="Формат выгрузки"),
+        session_factory: async_sessionmaker = Depends(get_read_session_factory),
+        db: AsyncSession = Depends(get_read_db)
+):
+    query, ledger, _ = await ledger_source(db, BudgetListFilter(), user_id=principal.id, type_budget='income')
+    query = query.order_by(ledger.date, ledger.id)
 
-    types_query = select(IncomeType).where(IncomeType.id == budget.type_id)
-    types_result = await db.execute(types_query)
-    types = types_result.scalar_one_or_none()
+    return StreamingResponse(
+        stream_ledger(query, export_format, session_factory),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="income.{export_format.value}"'}
+    )
 
 
-    if wallet_res is None:
-        raise HTTPException(status_code=400, detail="Данного кошелька не существует")
+@router_income_list.get("/search", response_model=BudgetSearchResponse, status_code=200,
+                        summary="Поиск по доходам 🔎",
+                        dependencies=[Depends(ledger_etag)])
+async def search_income(
+        q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос"),
+        per_page: int = Query(15, ge=1, le=100, description="Элементов на странице"),
+        cursor: Optional[str] = Query(None, description="Курсор страницы из next_cursor"),
+        principal: Principal = Depends(get_principal),
+        db: AsyncSession = Depends(get_read_db)
+):
+    return await search_entries(db, principal, 'income', q, per_page, cursor)
 
-    if types is None:
-        raise HTTPException(status_code=400, detail="Данного типа дохода не существует")
 
-    result_cur_data = await get_currency_one(db, budget.currency, wallet_res.currency_id)
-    new_budget = budget.value * result_cur_data.quotes[result_cur_data.fields]
+@router_income_list.post("/import", response_model=ImportResponse, status_code=201, openapi_extra=IMPORT_OPENAPI,
+                         summary="Импорт доходов из CSV или JSON 📥")
+async def import_income(
+        request: Request,
+        principal: Principal = Depends(get_principal),
+        db: AsyncSession = Depends(get_db)
+):
+    items = await parse_import_body(request)
+    return await import_entries(db, principal.id, 'income', items)
 
-    wallet_res.value += new_budget
-    db.add(wallet_res)
-    new_budget = BudgetList(
-        name=budget.name,
-        description=budget.description,
-        date=budget.date,
-        value=budget.value,
-        currency=budget.currency,
-        content=budget.content,
-        user_id=user_id,
-        type_id=budget.type_id,
-        currency_value= result_cur_data.quotes[result_cur_data.fields],
-        wallet_id = wallet_res.id,
-        type_budget = 'income'
-    )
-    db.add(new_budget)
-    await db.commit()
-    await db.refresh(new_budget, attribute_names=["type"])
 
-    return new_budget
+@router_income_list.post("/batch", response_model=BatchResponse, status_code=200, summary="Пакетно добавить и удалить доходы 📦")
+async def batch_income(
+        batch: BudgetBatchRequest,
+        principal: Principal = Depends(get_principal),
+        db: AsyncSession = Depends(get_db)
+):
+    return await apply_batch(db, principal, 'income', batch)
+
 
 @router_income_list.post("", response_model=BudgetListResponse, status_code=201, summary="Добавить доход 💶")
 async def create_budget(budget: BudgetListCreate,
-                        request: Request,
-                        response: Response,
+                        principal: Principal = Depends(get_principal),
                         db: AsyncSession = Depends(get_db)
                         ):
-    user = await get_current_user(request, response, db)
-    user_id = user.id
+    user_id = principal.id
 
-    wallet = select(Wallet).where(Wallet.user_id == user_id, Wallet.id == budget.wallet_id).with_for_update()
+    wallet = select(Wallet).where(Wallet.user_id == user_id, Wallet.id == budget.wallet_id)
     wallet_result = await db.execute(wallet)
     wallet_res = wallet_result.scalar_one_or_none()
 
 
-    types_query = select(IncomeType).where(IncomeType.id == budget.type_id)
-    types_result = await db.execute(types_query)
-    types = types_result.scalar_one_or_none()
+    types = await type_catalog.get(db, 'income', budget.type_id)
 
 
     if wallet_res is None:
@@ -189,12 +177,14 @@ async def create_budget(budget: BudgetListCreate,
         raise HTTPException(status_code=400, detail="Данного типа дохода не существует")
 
     result_cur_data = await get_currency_one(db, budget.currency, wallet_res.currency_id)
-    new_budget = budget.value * result_cur_data.quotes[result_cur_data.fields]
-
+    currency_value = result_cur_data.quotes[result_cur_data.fields]
 
+    wallet_value = await change_wallet_value(db, wallet_res.id, user_id, budget.value * currency_value)
+    if wallet_value is None:
+        # кошелек удалили между проверкой и записью
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Данного кошелька не существует")
 
-    wallet_res.value += new_budget
-    db.add(wallet_res)
     new_budget = BudgetList(
         name=budget.name,
         description=budget.description,
@@ -204,13 +194,13 @@ async def create_budget(budget: BudgetListCreate,
         content=budget.content,
         user_id=user_id,
         type_id=budget.type_id,
-        currency_value= result_cur_data.quotes[result_cur_data.fields],
+        currency_value=currency_value,
         wallet_id = wallet_res.id,
         type_budget = 'income'
     )
     db.add(new_budget)
+    await on_entry_created(db, new_budget)
     await db.commit()
-
     await db.refresh(new_budget, attribute_names=["type"])
 
     return new_budget
@@ -221,16 +211,14 @@ async def create_budget(budget: BudgetListCreate,
 async def update_budget(
         id: int,
         update_data: BudgetListUpdate,
-        request: Request,
-        response: Response,
+        principal: Principal = Depends(get_principal),
         db: AsyncSession = Depends(get_db)):
 
     query = select(BudgetList).where(BudgetList.id == id)
     result = await db.execute(query)
     budget = result.scalar_one_or_none()
-    user = await get_current_user(request, response, db)
-    user_id = user.id
-    is_admin = await check_is_admin_role(request, response, db)
+    user_id = principal.id
+    is_admin = principal.is_admin
 
     if not budget:
         raise HTTPException(status_code=404, detail=f"Доход с id {id} не найдена")
@@ -248,9 +236,11 @@ async def update_budget(
     await validate_foreign_keys(db, budget, update_data_dict)
 
 
+    old_budget = entry_snapshot(budget)
     for field, value in update_data_dict.items():
         setattr(budget, field, value)
 
+    await on_entry_updated(db, old_budget, budget)
     await db.commit()
     await db.refresh(budget, attribute_names=["type"])
 
@@ -260,12 +250,10 @@ async def update_budget(
 @router_income_list.delete("/{id}",status_code=200, summary="Удалить выбранный доход ❌")
 async def delete_currency(
         id: int,
-        request: Request,
-        response: Response,
+        principal: Principal = Depends(get_principal),
         db: AsyncSession = Depends(get_db)):
-    user = await get_current_user(request, response, db)
-    user_id = user.id
-    is_admin = await check_is_admin_role(request, response, db)
+    user_id = principal.id
+    is_admin = principal.is_admin
 
     query = select(BudgetList).where(BudgetList.id == id)
     result = await db.execute(query)
@@ -277,16 +265,10 @@ async def delete_currency(
     if budget is None:
         raise HTTPException(status_code=404, detail="Доход не найден")
 
-    wallet = select(Wallet).where(Wallet.user_id == user_id, Wallet.id == budget.wallet_id).with_for_update()
-    wallet_result = await db.execute(wallet)
-    wallet_res = wallet_result.scalar_one_or_none()
-
-    new_budget = budget.value * budget.currency_value
-
-    wallet_res.value -= new_budget
-    db.add(wallet_res)
+    await change_wallet_value(db, budget.wallet_id, budget.user_id, -budget.value * budget.currency_value)
 
     await db.delete(budget)
+    await on_entry_deleted(db, budget)
     await db.commit()
 
     return {"message": "Доход удален"}
\ No newline at end of file
@@ -1,45 +1,50 @@
-from fastapi import APIRouter, Depends, Request, Query, Response, HTTPException
+from datetime import date
+from typing import List
+
+from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from app.Models.other.meta_data import PaginatedResponse
-from app.Models.wallet.wallet_model import WalletResponse, WalletCreate, WalletUpdateValue, WalletUpdate
+from app.Models.wallet.wallet_model import WalletResponse, WalletCreate, WalletUpdateValue, WalletUpdate, \
+    WalletBalanceResponse, WalletBalancePoint
 from app.Models.wallet.wallet_model_alchemy import Wallet
+from app.api.deps import get_read_db
 from app.database.database import get_db
-from app.helpers.auth.check_login import get_current_user
-from app.helpers.auth.check_role import check_is_admin_role
+from app.helpers.auth.principal import Principal, get_principal
+from app.helpers.other.data_version import CURRENCY_SCOPE, WALLET_SCOPE, bump_version, etag_guard
+from app.helpers.other.entity_counter import bump_counter
 from app.helpers.other.meta_generator import meta_generator
+from app.helpers.wallet.balance_index import balance_as_of, balance_series
+from app.helpers.wallet.wallet_ledger import ledger_base_value
+from app.helpers.wallet.wallet_response import wallet_responses
 
-router_wallet = APIRouter(prefix="/wallet", tags=["Кошельки 👛"], dependencies=[Depends(get_current_user)])
+router_wallet = APIRouter(prefix="/wallet", tags=["Кошельки 👛"], dependencies=[Depends(get_principal)])
 
 
-@router_wallet.get("", status_code=200, response_model=PaginatedResponse[WalletResponse], summary='Получить свои кошельки 👛')
+@router_wallet.get("", status_code=200, response_model=PaginatedResponse[WalletResponse], summary='Получить свои кошельки 👛',
+                   dependencies=[Depends(etag_guard(WALLET_SCOPE, shared_scopes=[CURRENCY_SCOPE]))])
 async def get_wallet(
-        request: Request,
-        response: Response,
+        principal: Principal = Depends(get_principal),
         page: int = Query(1, ge=1, description="Номер страницы"),
         per_page: int = Query(15, ge=1, le=100, description="Элементов на странице"),
-        db: AsyncSession = Depends(get_db)
+        db: AsyncSession = Depends(get_read_db)
 ):
-    user = await get_current_user(request, response, db)
-    user_id = user.id
+    user_id = principal.id
     offset = (page - 1) * per_page
-    is_admin = await check_is_admin_role(request, response, db)
+    is_admin = principal.is_admin
 
 
-    query = select(Wallet).options(
-        selectinload(Wallet.currency)
-    )
+    query = select(Wallet)
 
     if not is_admin:
         query = query.where(Wallet.user_id == user_id)
 
     query = query.order_by(Wallet.user_id).offset(offset).limit(per_page)
-    pagination = await meta_generator(page, per_page, Wallet, db)
+    pagination = await meta_generator(page, per_page, Wallet, db, user_id=None if is_admin else user_id)
     result = await db.execute(query)
     wallets = result.scalars().all()
-    wallets_list = list(wallets)
+    wallets_list = await wallet_responses(db, wallets)
 
     return PaginatedResponse(
         data=wallets_list,
@@ -47,15 +52,49 @@ async def get_wallet(
     )
 
 
+async def get_own_wallet(db: AsyncSession, wallet_id: int, principal: Principal) -> Wallet:
+    wallet = await db.get(Wallet, wallet_id)
+    if wallet is None:
+        raise HTTPException(status_code=404, detail='Кошелек не найден')
+    if not principal.is_admin and wallet.user_id != principal.id:
+        raise HTTPException(status_code=400, detail='Кошелек не относистя к авторизованному пользователю')
+    return wallet
+
+
+@router_wallet.get("/{id}/balance", status_code=200, response_model=WalletBalanceResponse,
+                   summary='Баланс кошелька на дату 📅')
+async def get_wallet_balance(
+        id: int,
+        principal: Principal = Depends(get_principal),
+        on_date: date = Query(..., alias="date", description="Дата, на конец которой нужен баланс"),
+        db: AsyncSession = Depends(get_read_db)
+):
+    await get_own_wallet(db, id, principal)
+    return WalletBalanceResponse(wallet_id=id, date=on_date, balance=await balance_as_of(db, id, on_date))
+
+
+@router_wallet.get("/{id}/balance/series", status_code=200, response_model=List[WalletBalancePoint],
+                   summary='Баланс кошелька по дням 📈')
+async def get_wallet_balance_series(
+        id: int,
+        principal: Principal = Depends(get_principal),
+        date_from: date = Query(..., description="Начальная дата"),
+        date_to: date = Query(..., description="Конечная дата"),
+        db: AsyncSession = Depends(get_read_db)
+):
+    await get_own_wallet(db, id, principal)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="Начальная дата позже конечной")
+    return await balance_series(db, id, date_from, date_to)
+
+
 @router_wallet.post("", status_code=201, response_model=WalletResponse, summary='Создать новый кошелек 💰')
 async def create_wallet(
         new_wallet: WalletCreate,
-        request: Request,
-        response: Response,
+        principal: Principal = Depends(get_principal),
         db: AsyncSession = Depends(get_db)
 ):
-    user = await get_current_user(request, response, db)
-    user_id = user.id
+    user_id = principal.id
 
     prev_wallet_query = select(Wallet).where(Wallet.user_id == user_id, Wallet.currency_id == new_wallet.currency_id)
     prev_wallet = await db.execute(prev_wallet_query)
@@ -80,44 +119,44 @@ async def create_wallet(
         user_id = user_id
     )
     db.add(wallet_dto)
+    await bump_counter(db, Wallet, user_id, 1)
+    await bump_version(db, WALLET_SCOPE, user_id)
     await db.commit()
-    await db.refresh(wallet_dto, attribute_names=["currency"])
 
-    return wallet_dto
+    return (await wallet_responses(db, [wallet_dto]))[0]
 
 
 @router_wallet.delete("/id", status_code=201, summary='Удалить кошелек ❌')
-async def delete_wallet(id: int,  request: Request,
-        response: Response, db: AsyncSession = Depends(get_db) ):
+async def delete_wallet(id: int,  principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db) ):
     wallet_query = select(Wallet).where(Wallet.id == id)
     wallet = await db.execute(wallet_query)
     wallet_res = wallet.scalar_one_or_none()
     if wallet_res is None:
         raise HTTPException(status_code=404, detail='Кошелек не найден')
 
-    user = await get_current_user(request, response, db)
-    user_id = user.id
+    user_id = principal.id
 
     if wallet_res.user_id != user_id:
         raise HTTPException(status_code=400, detail='Кошелек не относистя к авторизованному пользователю')
 
 
     await db.delete(wallet_res)
+    await bump_counter(db, Wallet, user_id, -1)
+    await bump_version(db, WALLET_SCOPE, user_id)
     await db.commit()
 
     return {"message": "Кошелек успешно удален"}
 
 
 @router_wallet.patch("/id", status_code= 200, response_model=WalletResponse, summary="Изменить даные кошелька 💰")
-async def update_wallet(id: int, new_wallet_data: WalletUpdate, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+async def update_wallet(id: int, new_wallet_data: WalletUpdate, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
     wallet_query = select(Wallet).where(Wallet.id == id).with_for_update()
     wallet = await db.execute(wallet_query)
     wallet_res = wallet.scalar_one_or_none()
     if wallet_res is None:
         raise HTTPException(status_code=404, detail='Кошелек не найден')
 
-    user = await get_current_user(request, response, db)
-    user_id = user.id
+    user_id = principal.id
 
     if wallet_res.user_id != user_id:
         raise HTTPException(status_code=400, detail='Кошелек не относистя к авторизованному пользователю')
@@ -127,10 +166,13 @@ async def update_wallet(id: int, new_wallet_data: WalletUpdate, request: Request
     if not update_wallet_dict:
         raise HTTPException(status_code=400, detail="Нет полей для обновления")
 
+    if update_wallet_dict.get("value") is not None:
+        update_wallet_dict["value"] = await ledger_base_value(db, wallet_res.id, update_wallet_dict["value"])
+
     for field, value in update_wallet_dict.items():
         setattr(wallet_res, field, value)
 
+    await bump_version(db, WALLET_SCOPE, user_id)
     await db.commit()
-    await db.refresh(wallet_res, attribute_names=["currency"])
 
-    return wallet_res
+    return (await wallet_responses(db, [wallet_res]))[0]
@@ -0,0 +1,17 @@
+import asyncio
+
+from app.database.database import AsyncSessionLocal
+from app.helpers.budget_list.ledger_archive import LEDGER_ARCHIVE_AFTER_DAYS, archive_entries, archive_horizon
+
+
+async def main():
+    if LEDGER_ARCHIVE_AFTER_DAYS <= 0:
+        print("Архивирование выключено: LEDGER_ARCHIVE_AFTER_DAYS не задан")
+        return
+    async with AsyncSessionLocal() as db:
+        count = await archive_entries(db, archive_horizon())
+    print(f"Перенесено в архив записей: {count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
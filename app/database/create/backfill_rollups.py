@@ -0,0 +1,14 @@
+import asyncio
+
+from app.database.database import AsyncSessionLocal
+from app.helpers.budget_list.ledger_rollup import rebuild_rollups
+
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        await rebuild_rollups(db)
+    print("Агрегаты доходов и затрат пересчитаны")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
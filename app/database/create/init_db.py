@@ -12,6 +12,8 @@ DB_NAME = os.getenv("DB_NAME", "")
 DB_USER = os.getenv("DB_USER", "")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "")
 DB_DRIVER = os.getenv("DB_DRIVER", "")
+# скрипт запускается напрямую, без пакета app: флаг читается так же, как в ledger_partitions
+BUDGET_LIST_PARTITIONED = os.getenv("BUDGET_LIST_PARTITIONED", "false").lower() in ("1", "true", "yes")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
@@ -30,6 +32,11 @@ async def create_table():
         )
     """
     )
+    await conn.execute(
+        """
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS role_version INTEGER NOT NULL DEFAULT 1
+    """
+    )
     print("Таблица users создана")
 
     await conn.execute(
@@ -43,6 +50,19 @@ async def create_table():
     )
     print("Таблица currency создана")
 
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS currency_rate (
+            source VARCHAR(3) NOT NULL,
+            target VARCHAR(3) NOT NULL,
+            value DOUBLE PRECISION NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (source, target)
+        )
+    """
+    )
+    print("Таблица currency_rate создана")
+
     await conn.execute(
         """
         CREATE TABLE IF NOT EXISTS role (
@@ -68,22 +88,161 @@ async def create_table():
     )
     print("Таблица expense_types создана")
 
+    if BUDGET_LIST_PARTITIONED:
+        # ключ партиционирования обязан входить в первичный ключ, поэтому PK (id, date)
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS budget_list (
+                id SERIAL,
+                date TIMESTAMPTZ NOT NULL,
+                name TEXT NOT NULL,
+                value NUMERIC(10, 6) NULL,
+                currency INT REFERENCES currency(id),
+                description TEXT NULL,
+                content TEXT NULL,
+                user_id INT REFERENCES users(id),
+                type_id INT NULL REFERENCES expense_types(id),
+                PRIMARY KEY (id, date)
+            ) PARTITION BY RANGE (date)
+        """
+        )
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS budget_list_default PARTITION OF budget_list DEFAULT
+        """
+        )
+        # помесячные партиции создает maintain_partitions: при старте приложения
+        # или python -m app.database.create.maintain_partitions
+    else:
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS budget_list (
+                id SERIAL PRIMARY KEY,
+                date TIMESTAMPTZ NULL,
+                name TEXT NOT NULL,
+                value NUMERIC(10, 6) NULL,
+                currency INT REFERENCES currency(id),
+                description TEXT NULL,
+                content TEXT NULL,
+                user_id INT REFERENCES users(id),
+                type_id INT NULL REFERENCES expense_types(id)
+            )
+        """
+        )
     await conn.execute(
         """
-        CREATE TABLE IF NOT EXISTS budget_list (
-            id SERIAL PRIMARY KEY,
-            date TIMESTAMPTZ NULL,
+        ALTER TABLE budget_list ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64) NULL
+    """
+    )
+    await conn.execute(
+        """
+        DROP INDEX IF EXISTS ix_budget_list_user_content_hash
+    """
+    )
+    # уникальный индекс для ON CONFLICT при импорте; date нужна, так как таблица может быть партиционирована
+    await conn.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_budget_list_user_content_hash
+        ON budget_list(user_id, content_hash, date) WHERE content_hash IS NOT NULL
+    """
+    )
+    await conn.execute(
+        """
+        ALTER TABLE budget_list
+            ADD COLUMN IF NOT EXISTS type_budget TEXT NOT NULL DEFAULT '',
+            ADD COLUMN IF NOT EXISTS wallet_id INT NULL,
+            ADD COLUMN IF NOT EXISTS currency_value DOUBLE PRECISION NULL
+    """
+    )
+    await conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_budget_list_user_kind_date ON budget_list(user_id, type_budget, date, id)
+    """
+    )
+    await conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_budget_list_user_kind_wallet_date
+            ON budget_list(user_id, type_budget, wallet_id, date)
+    """
+    )
+    await conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_budget_list_user_kind_type_date
+            ON budget_list(user_id, type_budget, type_id, date)
+    """
+    )
+    # btree_gin нужен, чтобы user_id и search_vector были в одном GIN-индексе
+    await conn.execute(
+        """
+        CREATE EXTENSION IF NOT EXISTS btree_gin
+    """
+    )
+    await conn.execute(
+        """
+        ALTER TABLE budget_list ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                to_tsvector('simple'::regconfig,
+                    coalesce(name, '') || ' ' || coalesce(description, '') || ' ' || coalesce(content, ''))
+            ) STORED
+    """
+    )
+    await conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_budget_list_user_search ON budget_list USING gin (user_id, search_vector)
+    """
+    )
+    print("Таблица budget_list создана")
+
+    # toast_tuple_target = 128 (минимум) - порог, с которого Postgres пробует сжимать текстовые колонки строки;
+    # с умолчанием (~2 КБ) узкие архивные строки не сжимались бы вовсе. Строки короче порога хранятся как есть
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS budget_list_archive (
+            id INT PRIMARY KEY,
+            date TIMESTAMPTZ NOT NULL,
             name TEXT NOT NULL,
-            value NUMERIC(10, 6) NULL,
-            currency INT REFERENCES currency(id),
+            value DOUBLE PRECISION NULL,
+            currency INT NULL,
             description TEXT NULL,
+            type_budget TEXT NOT NULL DEFAULT '',
             content TEXT NULL,
-            user_id INT REFERENCES users(id),
-            type_id INT NULL REFERENCES expense_types(id)
-        )
+            user_id INT NULL,
+            type_id INT NULL,
+            currency_value DOUBLE PRECISION NULL,
+            wallet_id INT NULL,
+            content_hash VARCHAR(64) NULL
+        ) WITH (toast_tuple_target = 128)
     """
     )
-    print("Таблица budget_list создана")
+    await conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_budget_list_archive_user_kind_date
+            ON budget_list_archive(user_id, type_budget, date, id)
+    """
+    )
+    # MAIN - сжатие внутри строки, в TOAST значение уходит, только если строка и после сжатия не помещается
+    await conn.execute(
+        """
+        ALTER TABLE budget_list_archive
+            ALTER COLUMN name SET STORAGE MAIN,
+            ALTER COLUMN description SET STORAGE MAIN,
+            ALTER COLUMN content SET STORAGE MAIN
+    """
+    )
+    # lz4 быстрее pglz и, в отличие от него, не пропускает значения короче 32 байт.
+    # Нужен Postgres 14+, собранный с lz4; иначе остается pglz. Действует на новые записи архива
+    try:
+        await conn.execute(
+            """
+            ALTER TABLE budget_list_archive
+                ALTER COLUMN name SET COMPRESSION lz4,
+                ALTER COLUMN description SET COMPRESSION lz4,
+                ALTER COLUMN content SET COMPRESSION lz4
+        """
+        )
+    except asyncpg.PostgresError as e:
+        print(f"Сжатие lz4 для budget_list_archive недоступно, остается pglz: {e}")
+    print("Таблица budget_list_archive создана")
 
 
     await conn.execute(
@@ -100,6 +259,158 @@ async def create_table():
     )
     print("Таблица wallet создана")
 
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS wallet_ledger (
+            id BIGSERIAL PRIMARY KEY,
+            wallet_id INT NOT NULL REFERENCES wallet(id) ON DELETE CASCADE,
+            delta DOUBLE PRECISION NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """
+    )
+    await conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_wallet_ledger_wallet_id ON wallet_ledger(wallet_id)
+    """
+    )
+    print("Таблица wallet_ledger создана")
+
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS wallet_balance_day (
+            wallet_id INT NOT NULL REFERENCES wallet(id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            net DOUBLE PRECISION NOT NULL DEFAULT 0,
+            cumulative DOUBLE PRECISION NOT NULL DEFAULT 0,
+            PRIMARY KEY (wallet_id, day)
+        )
+    """
+    )
+    await conn.execute(
+        "ALTER TABLE wallet_balance_day ADD COLUMN IF NOT EXISTS dirty BOOLEAN NOT NULL DEFAULT false"
+    )
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS ix_wallet_balance_day_dirty ON wallet_balance_day (wallet_id, day) WHERE dirty"
+    )
+    print("Таблица wallet_balance_day создана")
+
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS wallet_balance_flow (
+            id BIGSERIAL PRIMARY KEY,
+            wallet_id INT NOT NULL REFERENCES wallet(id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            net DOUBLE PRECISION NOT NULL
+        )
+    """
+    )
+    await conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_wallet_balance_flow_wallet_day ON wallet_balance_flow(wallet_id, day)
+    """
+    )
+    print("Таблица wallet_balance_flow создана")
+
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS entity_counter (
+            user_id INT NOT NULL,
+            entity VARCHAR(50) NOT NULL,
+            type_budget VARCHAR(20) NOT NULL DEFAULT '',
+            total BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, entity, type_budget)
+        )
+    """
+    )
+    print("Таблица entity_counter создана")
+
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS entity_counter_delta (
+            id BIGSERIAL PRIMARY KEY,
+            user_id INT NOT NULL,
+            entity VARCHAR(50) NOT NULL,
+            type_budget VARCHAR(20) NOT NULL DEFAULT '',
+            delta BIGINT NOT NULL
+        )
+    """
+    )
+    await conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_entity_counter_delta_entity_user
+        ON entity_counter_delta(entity, user_id, type_budget)
+    """
+    )
+    print("Таблица entity_counter_delta создана")
+
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+            scope VARCHAR(20) NOT NULL,
+            user_id INT NOT NULL DEFAULT 0,
+            version BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, user_id)
+        )
+    """
+    )
+    print("Таблица data_version создана")
+
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS data_version_event (
+            id BIGSERIAL PRIMARY KEY,
+            scope VARCHAR(20) NOT NULL,
+            user_id INT NOT NULL DEFAULT 0
+        )
+    """
+    )
+    await conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_data_version_event_scope_user ON data_version_event(scope, user_id)
+    """
+    )
+    print("Таблица data_version_event создана")
+
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ledger_rollup (
+            user_id INT NOT NULL,
+            wallet_id INT NOT NULL DEFAULT 0,
+            type_budget VARCHAR(20) NOT NULL,
+            type_id INT NOT NULL DEFAULT 0,
+            period VARCHAR(10) NOT NULL,
+            period_start DATE NOT NULL,
+            total DOUBLE PRECISION NOT NULL DEFAULT 0,
+            count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, wallet_id, type_budget, type_id, period, period_start)
+        )
+    """
+    )
+    print("Таблица ledger_rollup создана")
+
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ledger_rollup_delta (
+            id BIGSERIAL PRIMARY KEY,
+            user_id INT NOT NULL,
+            wallet_id INT NOT NULL DEFAULT 0,
+            type_budget VARCHAR(20) NOT NULL,
+            type_id INT NOT NULL DEFAULT 0,
+            period VARCHAR(10) NOT NULL,
+            period_start DATE NOT NULL,
+            total DOUBLE PRECISION NOT NULL,
+            count BIGINT NOT NULL
+        )
+    """
+    )
+    await conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_ledger_rollup_delta_user_id ON ledger_rollup_delta(user_id)
+    """
+    )
+    print("Таблица ledger_rollup_delta создана")
+
 
     await conn.execute(
         """
@@ -0,0 +1,14 @@
+import asyncio
+
+from app.database.database import AsyncSessionLocal
+from app.helpers.budget_list.ledger_partitions import maintain_partitions
+
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        created, detached = await maintain_partitions(db)
+    print(f"Партиции budget_list: создано {created}, отсоединено {detached}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
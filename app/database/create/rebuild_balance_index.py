@@ -0,0 +1,14 @@
+import asyncio
+
+from app.database.database import AsyncSessionLocal
+from app.helpers.wallet.balance_index import rebuild_balance_index
+
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        await rebuild_balance_index(db)
+    print("Индекс балансов кошельков пересчитан")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
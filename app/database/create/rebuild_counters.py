@@ -0,0 +1,14 @@
+import asyncio
+
+from app.database.database import AsyncSessionLocal
+from app.helpers.other.entity_counter import rebuild_counters
+
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        await rebuild_counters(db)
+    print("Счетчики записей пересчитаны")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
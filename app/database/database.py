@@ -18,6 +18,17 @@ DB_DRIVER = os.getenv("DB_DRIVER", "")
 
 DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# реплика только для чтения; пустой DB_REPLICA_HOST - все запросы идут в основную базу
+DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST", "")
+DB_REPLICA_PORT = os.getenv("DB_REPLICA_PORT", DB_PORT)
+# недоступная реплика не должна держать соединение дольше этого, дальше читаем из основной базы
+DB_REPLICA_CONNECT_TIMEOUT = float(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", "2"))
+
+REPLICA_DATABASE_URL = (
+    f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_REPLICA_HOST}:{DB_REPLICA_PORT}/{DB_NAME}"
+    if DB_REPLICA_HOST else None
+)
+
 engine = create_async_engine(
     DATABASE_URL,
     echo=True,  # будет видно SQL запросы (удобно для разработки)
@@ -29,6 +40,18 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+replica_engine = create_async_engine(
+    REPLICA_DATABASE_URL,
+    echo=True,
+    connect_args={"timeout": DB_REPLICA_CONNECT_TIMEOUT, "command_timeout": DB_REPLICA_CONNECT_TIMEOUT}
+) if REPLICA_DATABASE_URL else None
+
+ReadSessionLocal = async_sessionmaker(
+    replica_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+) if replica_engine is not None else None
+
 async def get_db() -> AsyncGenerator[Any, Any]:
     async with AsyncSessionLocal() as session:
         yield session
@@ -0,0 +1,185 @@
+import asyncio
+import math
+import os
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+from typing import Dict
+
+from dotenv import load_dotenv
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+
+from app.database.database import ReadSessionLocal, replica_engine
+
+
+load_dotenv()
+
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "1"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "1"))
+
+# 0, если база не реплика или все полученное WAL уже применено.
+# NULL, если WAL receiver не в состоянии streaming: без него receive_lsn = replay_lsn ничего не значит,
+# реплика просто перестала получать изменения. Статус виден роли с pg_read_all_stats (или суперпользователю),
+# без этих прав он NULL и чтение остается на основной базе.
+REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+# записи с user_id = 0 (валюты) общие, после них все читают из основной базы
+SHARED_WRITER = 0
+
+# время последней записи клиента (unix, секунды): другие воркеры и процессы видят его в запросе
+LAST_WRITE_COOKIE = "last_write_at"
+
+# отметка записи в текущем HTTP-запросе, ее выставляет after_commit, а в ответ переносит ReadYourWritesMiddleware
+_request_write: ContextVar[dict | None] = ContextVar("request_write", default=None)
+
+
+class ReplicaRouter:
+    """
+    Решает, можно ли читать с реплики: нет ли у пользователя своей записи за последние
+    READ_YOUR_WRITES_SECONDS и не отстает ли реплика больше REPLICA_MAX_LAG.
+    Отставание проверяется в фоне не чаще раза в REPLICA_LAG_CHECK_INTERVAL; пока проверки нет
+    или она завершилась ошибкой, читаем из основной базы.
+    Отметки записей хранятся в памяти процесса и, чтобы окно работало на любом воркере,
+    в cookie LAST_WRITE_COOKIE у клиента.
+    """
+
+    def __init__(
+            self,
+            window: float = READ_YOUR_WRITES_SECONDS,
+            max_lag: float = REPLICA_MAX_LAG,
+            check_interval: float = REPLICA_LAG_CHECK_INTERVAL
+    ):
+        self.window = window
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._writes: Dict[int, float] = {}
+        self._lag: float | None = None
+        self._checked_at: float | None = None
+        self._check_task: asyncio.Task | None = None
+
+    def mark_write(self, user_id: int):
+        now = time.monotonic()
+        self._writes[user_id] = now
+        if len(self._writes) > 10000:
+            self._writes = {key: at for key, at in self._writes.items() if now - at < self.window}
+
+    def recently_wrote(self, user_id: int, last_write_at: float | None = None) -> bool:
+        if last_write_at is not None and time.time() - last_write_at < self.window:
+            return True
+        now = time.monotonic()
+        return any(
+            now - self._writes[key] < self.window
+            for key in (user_id, SHARED_WRITER)
+            if key in self._writes
+        )
+
+    def replica_lag(self) -> float | None:
+        """
+        Последнее измеренное отставание. Если оно устарело, проверка запускается в фоне,
+        а до ее окончания возвращается None - запрос читает из основной базы и не ждет реплику.
+        """
+        if self._is_fresh():
+            return self._lag
+        if self._check_task is None or self._check_task.done():
+            self._check_task = asyncio.create_task(self._check_lag())
+        return None
+
+    async def _check_lag(self):
+        try:
+            async with replica_engine.connect() as conn:
+                lag = (await conn.execute(REPLICA_LAG_SQL)).scalar()
+            # None - реплика не получает WAL, читаем из основной базы
+            self._lag = None if lag is None else float(lag)
+        except Exception as e:
+            print(f"Ошибка проверки реплики: {e}")
+            self._lag = None
+        self._checked_at = time.monotonic()
+
+    def use_replica(self, user_id: int, last_write_at: float | None = None) -> bool:
+        if ReadSessionLocal is None or self.recently_wrote(user_id, last_write_at):
+            return False
+        lag = self.replica_lag()
+        return lag is not None and lag <= self.max_lag
+
+    def _is_fresh(self) -> bool:
+        return self._checked_at is not None and time.monotonic() - self._checked_at < self.check_interval
+
+
+replica_router = ReplicaRouter()
+
+
+def note_write(db: AsyncSession, user_id: int):
+    """
+    Запоминает пользователя, чьи данные меняет транзакция; окно read-your-writes открывается после commit.
+    """
+    db.info.setdefault("written_user_ids", set()).add(user_id)
+
+
+def last_write_from_cookie(value: str | None) -> float | None:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """
+    Если запрос что-то записал и закоммитил, ответ ставит cookie LAST_WRITE_COOKIE с временем записи.
+    По нему get_read_session_factory читает из основной базы, даже если запрос попал на другой воркер.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        written = {}
+        token = _request_write.set(written)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and "at" in written:
+                cookie = SimpleCookie()
+                cookie[LAST_WRITE_COOKIE] = f"{written['at']:.3f}"
+                cookie[LAST_WRITE_COOKIE]["max-age"] = math.ceil(replica_router.window)
+                cookie[LAST_WRITE_COOKIE]["path"] = "/"
+                cookie[LAST_WRITE_COOKIE]["httponly"] = True
+                cookie[LAST_WRITE_COOKIE]["samesite"] = "lax"
+                cookie[LAST_WRITE_COOKIE]["secure"] = True
+                MutableHeaders(scope=message).append("set-cookie", cookie.output(header="").strip())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _request_write.reset(token)
+
+
+@event.listens_for(Session, "after_commit")
+def mark_committed_writes(session):
+    user_ids = session.info.pop("written_user_ids", ())
+    for user_id in user_ids:
+        replica_router.mark_write(user_id)
+    written = _request_write.get()
+    if user_ids and written is not None:
+        written["at"] = time.time()
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_rolled_back_writes(session):
+    session.info.pop("written_user_ids", None)
@@ -1,6 +1,7 @@
 from fastapi import Depends, HTTPException, Request, Response, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from starlette.responses import JSONResponse
 
 from app.Models.auth.user import User
@@ -9,6 +10,12 @@ from app.helpers.auth.remove_cookie import remove_cookie
 from app.helpers.auth.token import decode_access_token
 
 
+async def get_user_by_email(db: AsyncSession, email: str | None) -> User | None:
+    query = select(User).options(joinedload(User.role)).where(User.email == email)
+    result = await db.execute(query)
+    return result.scalar_one_or_none()
+
+
 async def get_current_user(
     request: Request,
     response: Response,
@@ -29,9 +36,7 @@ async def get_current_user(
             content={"detail": "Пользователь не в системе"}
         )
 
-    query = select(User).where(User.email == decoded_access_token.get("email"))
-    result = await db.execute(query)
-    user = result.scalar_one_or_none()
+    user = await get_user_by_email(db, decoded_access_token.get("email"))
 
     if not user:
         raise HTTPException(
@@ -1,4 +1,22 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
 import bcrypt
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+
+
+load_dotenv()
+
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+BCRYPT_QUEUE_LIMIT = int(os.getenv("BCRYPT_QUEUE_LIMIT", "32"))
+
+_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_pending = 0
+# уменьшается из потока пула, поэтому под блокировкой
+_pending_lock = threading.Lock()
 
 
 def hash_password(password: str) -> str:
@@ -14,3 +32,39 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         )
     except Exception:
         return False
+
+
+def _release(future: Future):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+async def _run_in_pool(func, *args):
+    """
+    Выполняет bcrypt в отдельном пуле потоков, чтобы не блокировать event loop.
+    Если в работе и в очереди уже BCRYPT_WORKERS + BCRYPT_QUEUE_LIMIT задач, запрос сразу отклоняется.
+    Место освобождается, когда задача закончилась в пуле, а не когда запрос перестал ее ждать:
+    отмененный запрос не дает поставить в очередь лишний bcrypt.
+    """
+    global _pending
+    with _pending_lock:
+        if _pending >= BCRYPT_WORKERS + BCRYPT_QUEUE_LIMIT:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервер перегружен, повторите попытку позже",
+                headers={"Retry-After": "1"}
+            )
+        _pending += 1
+
+    future = _executor.submit(func, *args)
+    future.add_done_callback(_release)
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_pool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_pool(verify_password, plain_password, hashed_password)
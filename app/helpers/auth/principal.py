@@ -0,0 +1,124 @@
+from dataclasses import dataclass
+from typing import Dict
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.auth.user import User
+from app.database.database import get_db
+from app.helpers.auth.check_login import get_user_by_email
+from app.helpers.auth.principal_cache import principal_cache
+from app.helpers.auth.remove_cookie import remove_cookie
+from app.helpers.auth.token import ACCESS_TOKEN_TYPE, decode_access_token
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    name: str
+    email: str
+    isactive: bool
+    role_id: int | None
+    role: str | None
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == 'ADMIN'
+
+
+known_role_versions: Dict[int, int] = {}
+
+
+def remember_role_version(user_id: int, role_version: int):
+    if role_version > known_role_versions.get(user_id, 0):
+        known_role_versions[user_id] = role_version
+
+
+@event.listens_for(User.role_id, "set")
+def bump_role_version(target: User, value, oldvalue, initiator):
+    """
+    Смена роли увеличивает role_version: токены со старой версией в этом процессе
+    перестают авторизовываться по claims и перепроверяются по базе.
+    """
+    if not inspect(target).persistent or value == oldvalue:
+        return
+    target.role_version = (target.role_version or 0) + 1
+    remember_role_version(target.id, target.role_version)
+    principal_cache.invalidate_user(target.id)
+
+
+def principal_from_claims(claims: dict) -> Principal | None:
+    """
+    Principal прямо из claims токена, без запроса в базу.
+    None, если это не access-токен, в нем нет роли или его role_version устарела.
+    """
+    if claims.get("typ") != ACCESS_TOKEN_TYPE:
+        return None
+    if "role" not in claims or "role_version" not in claims or "id" not in claims:
+        return None
+    if claims["role_version"] < known_role_versions.get(claims["id"], 0):
+        return None
+
+    return Principal(
+        id=claims["id"],
+        name=claims.get("name"),
+        email=claims.get("email"),
+        isactive=claims.get("isactive"),
+        role_id=None,
+        role=claims["role"]
+    )
+
+
+async def get_principal(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """
+    Пользователь и роль текущего запроса. FastAPI кэширует зависимость в рамках запроса,
+    а principal_cache - между запросами, пока действителен access-токен. Токены с ролью в claims
+    не требуют запросов в базу вовсе.
+    """
+    access_token = request.cookies.get("access_token")
+    if not access_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Нет активных пользователей, авторизируйтесь в приложении"
+        )
+
+    cached = principal_cache.get(access_token)
+    if cached is not None:
+        return cached[1]
+
+    claims = decode_access_token(access_token, ACCESS_TOKEN_TYPE)
+    if claims is None:
+        await remove_cookie(response)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Пользователь не в системе"
+        )
+
+    principal = principal_from_claims(claims)
+    if principal is not None:
+        principal_cache.set(access_token, claims, principal)
+        return principal
+
+    user = await get_user_by_email(db, claims.get("email"))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Нет активных пользователей, авторизируйтесь в приложении"
+        )
+
+    remember_role_version(user.id, user.role_version)
+    principal = Principal(
+        id=user.id,
+        name=user.name,
+        email=user.email,
+        isactive=user.isactive,
+        role_id=user.role_id,
+        role=user.role.role if user.role else None
+    )
+    principal_cache.set(access_token, claims, principal)
+    return principal
@@ -0,0 +1,85 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Set, Tuple
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_MAX_AGE = float(os.getenv("PRINCIPAL_CACHE_MAX_AGE", "300"))
+
+
+class PrincipalCache:
+    """
+    LRU-кэш проверенных access-токенов: подпись токена -> (claims, principal).
+    Запись живет до exp токена, но не дольше max_age. Сам токен хранится в записи и сравнивается целиком,
+    поэтому совпадение одной подписи не дает принять непроверенный токен.
+    """
+
+    def __init__(self, max_size: int = PRINCIPAL_CACHE_SIZE, max_age: float = PRINCIPAL_CACHE_MAX_AGE):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, Tuple[str, float, dict, Any]] = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return token.rsplit(".", 1)[-1]
+
+    def get(self, token: str) -> Tuple[dict, Any] | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != token:
+            self.misses += 1
+            return None
+
+        _, expires_at, claims, principal = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return claims, principal
+
+    def set(self, token: str, claims: dict, principal: Any):
+        exp = claims.get("exp")
+        if exp is None or self.max_size <= 0:
+            return
+
+        key = self._key(token)
+        self._remove(key)
+        self._entries[key] = (token, min(float(exp), time.time() + self.max_age), claims, principal)
+        self._by_user.setdefault(principal.id, set()).add(key)
+
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def invalidate_user(self, user_id: int):
+        for key in list(self._by_user.get(user_id, ())):
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_user.clear()
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[3].id
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+
+principal_cache = PrincipalCache()
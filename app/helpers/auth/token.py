@@ -12,25 +12,45 @@ ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")
 REFRESH_TOKEN_EXPIRE_DAYS = os.getenv("REFRESH_TOKEN_EXPIRE_DAYS")
 
+# claim typ: refresh-токен нельзя предъявить вместо access и наоборот
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
 
-def create_jwt_token(data: dict, expires_delta: timedelta):
+
+def create_jwt_token(data: dict, expires_delta: timedelta, token_type: str):
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "typ": token_type})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def user_token_data(user) -> dict:
+    return {
+        "id": user.id,
+        "email": user.email,
+        "name": user.name,
+        "isactive": user.isactive,
+        "role": user.role.role if user.role else None,
+        "role_version": user.role_version
+    }
+
+
 def create_access_token(data: dict):
-    return create_jwt_token(data, timedelta(minutes=float(ACCESS_TOKEN_EXPIRE_MINUTES)))
+    return create_jwt_token(data, timedelta(minutes=float(ACCESS_TOKEN_EXPIRE_MINUTES)), ACCESS_TOKEN_TYPE)
 
 
 def create_refresh_token(data: dict):
-    return create_jwt_token(data, timedelta(days=(float(REFRESH_TOKEN_EXPIRE_DAYS))))
+    return create_jwt_token(data, timedelta(days=(float(REFRESH_TOKEN_EXPIRE_DAYS))), REFRESH_TOKEN_TYPE)
 
 
-def decode_access_token(token: str):
+def decode_access_token(token: str, token_type: str = ACCESS_TOKEN_TYPE):
+    """
+    Claims токена или None, если подпись неверна, срок истек или typ не совпадает с token_type.
+    """
     try:
         decode = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        if decode.get("typ") != token_type:
+            return None
         return decode
     except ExpiredSignatureError:
         return None
@@ -0,0 +1,149 @@
+import asyncio
+import os
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone
+from typing import Any, List, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import Select, cast, delete, func, insert, null, select, union_all
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.Models.budget_list.budget_list import BudgetListFilter
+from app.Models.budget_list.budget_list_alchemy import BudgetList
+from app.Models.budget_list.budget_list_archive_alchemy import BudgetListArchive
+from app.database.database import AsyncSessionLocal
+from app.helpers.budget_list.ledger_filters import filter_conditions, has_filters
+from app.helpers.other.entity_counter import bump_counter, read_counter
+
+
+load_dotenv()
+
+# 0 - архивирование выключено
+LEDGER_ARCHIVE_AFTER_DAYS = int(os.getenv("LEDGER_ARCHIVE_AFTER_DAYS", "0"))
+LEDGER_ARCHIVE_INTERVAL = float(os.getenv("LEDGER_ARCHIVE_INTERVAL", "3600"))
+LEDGER_ARCHIVE_BATCH_SIZE = int(os.getenv("LEDGER_ARCHIVE_BATCH_SIZE", "1000"))
+
+# все колонки budget_list, кроме вычисляемого search_vector
+ARCHIVE_COLUMNS = [column.key for column in BudgetList.__table__.columns if column.computed is None]
+
+
+def archive_horizon(now: datetime | None = None) -> datetime:
+    return (now or datetime.now(timezone.utc)) - timedelta(days=LEDGER_ARCHIVE_AFTER_DAYS)
+
+
+def _scope(model, filters: BudgetListFilter, user_id: int | None, type_budget: str | None) -> List:
+    conditions = filter_conditions(filters, model)
+    if user_id is not None:
+        conditions.append(model.user_id == user_id)
+    if type_budget is not None:
+        conditions.append(model.type_budget == type_budget)
+    return conditions
+
+
+def _branch(model, conditions: List) -> Select:
+    return select(
+        *(getattr(model, name) for name in ARCHIVE_COLUMNS),
+        cast(null(), TSVECTOR).label("search_vector")
+    ).where(*conditions)
+
+
+async def _count(db: AsyncSession, model, conditions: List) -> int:
+    result = await db.execute(select(func.count()).select_from(model).where(*conditions))
+    return int(result.scalar())
+
+
+async def _reaches_archive(db: AsyncSession, filters: BudgetListFilter, conditions: List) -> bool:
+    """
+    Заходит ли диапазон дат в архив: граница - самая поздняя архивная запись пользователя,
+    а не текущая настройка, поэтому смена LEDGER_ARCHIVE_AFTER_DAYS ничего не прячет.
+    """
+    if filters.date_from is None:
+        return True
+    result = await db.execute(select(func.max(BudgetListArchive.date)).where(*conditions))
+    latest = result.scalar()
+    return latest is not None and latest >= datetime.combine(filters.date_from, time.min, tzinfo=timezone.utc)
+
+
+async def ledger_source(
+        db: AsyncSession,
+        filters: BudgetListFilter,
+        user_id: int | None = None,
+        type_budget: str | None = None
+) -> Tuple[Select, Any, int]:
+    """
+    Запрос для списка и экспорта: только budget_list или UNION ALL с архивом, если у пользователя
+    есть архивные записи и диапазон дат до них доходит. Фильтры применяются в каждой ветке отдельно,
+    поэтому индексы и отсечение партиций работают в обеих.
+    Возвращает (запрос, сущность для сортировки, total).
+    """
+    filtered = has_filters(filters)
+    live = _scope(BudgetList, filters, user_id, type_budget)
+    archived_total = await read_counter(db, BudgetListArchive, user_id, type_budget)
+
+    if filtered:
+        total = await _count(db, BudgetList, live)
+    else:
+        total = await read_counter(db, BudgetList, user_id, type_budget)
+
+    if not archived_total:
+        return select(BudgetList).where(*live), BudgetList, total
+
+    archive = _scope(BudgetListArchive, filters, user_id, type_budget)
+    if not await _reaches_archive(db, filters, archive):
+        return select(BudgetList).where(*live), BudgetList, total
+
+    ledger = aliased(BudgetList, union_all(_branch(BudgetList, live), _branch(BudgetListArchive, archive)).subquery("ledger"))
+    total += await _count(db, BudgetListArchive, archive) if filtered else archived_total
+    return select(ledger), ledger, total
+
+
+async def archive_entries(db: AsyncSession, before: datetime, batch_size: int = LEDGER_ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Переносит записи старше before в budget_list_archive пачками, каждая пачка - одна транзакция
+    (DELETE ... RETURNING внутри INSERT). Хуки удаления не вызываются: агрегаты ledger_rollup,
+    индекс балансов и сами кошельки остаются как есть, меняются только счетчики записей.
+    """
+    moved_total = 0
+    while True:
+        batch = (
+            select(BudgetList.id)
+            .where(BudgetList.date < before)
+            .order_by(BudgetList.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        moved = (
+            delete(BudgetList)
+            .where(BudgetList.id.in_(batch.scalar_subquery()))
+            .returning(*(BudgetList.__table__.c[name] for name in ARCHIVE_COLUMNS))
+            .cte("moved")
+        )
+        stmt = (
+            insert(BudgetListArchive)
+            .from_select(ARCHIVE_COLUMNS, select(*(moved.c[name] for name in ARCHIVE_COLUMNS)))
+            .returning(BudgetListArchive.user_id, BudgetListArchive.type_budget)
+        )
+        rows = (await db.execute(stmt)).all()
+
+        for (user_id, type_budget), count in Counter(tuple(row) for row in rows).items():
+            await bump_counter(db, BudgetList, user_id, -count, type_budget)
+            await bump_counter(db, BudgetListArchive, user_id, count, type_budget)
+        await db.commit()
+
+        moved_total += len(rows)
+        if len(rows) < batch_size:
+            return moved_total
+
+
+async def run_ledger_archiver(interval: float = LEDGER_ARCHIVE_INTERVAL):
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await archive_entries(db, archive_horizon())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Ошибка архивирования записей: {e}")
+        await asyncio.sleep(interval)
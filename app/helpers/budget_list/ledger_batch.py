@@ -0,0 +1,131 @@
+from collections import Counter, defaultdict
+
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.budget_list.budget_list import BudgetBatchRequest, BatchResponse, BatchItemResult, BatchItemStatus
+from app.Models.budget_list.budget_list_alchemy import BudgetList
+from app.helpers.auth.principal import Principal
+from app.helpers.budget_list.ledger_hooks import on_entries_created, on_entries_deleted
+from app.helpers.budget_list.ledger_references import load_references
+from app.helpers.wallet.change_wallet_value import change_wallet_value
+from app.helpers.wallet.wallet_ledger import lock_wallets
+
+
+async def apply_batch(
+        db: AsyncSession,
+        principal: Principal,
+        type_budget: str,
+        batch: BudgetBatchRequest
+) -> BatchResponse:
+    """
+    Применяет пачку созданий и удалений одной транзакцией.
+    Все затронутые кошельки блокируются один раз в порядке id (lock_wallets),
+    баланс каждого меняется одним изменением на итоговую разницу. Ошибка в отдельной записи не отменяет остальные, а попадает в ее статус.
+    Удаления применяются раньше созданий, поэтому освобожденные ими средства уже доступны новым затратам.
+    """
+    sign = -1 if type_budget == 'expense' else 1
+    delete_results = [BatchItemResult(operation="delete", index=index, id=entry_id, status=BatchItemStatus.ERROR)
+                      for index, entry_id in enumerate(batch.delete)]
+    create_results = [BatchItemResult(operation="create", index=index, status=BatchItemStatus.ERROR)
+                      for index in range(len(batch.create))]
+
+    entries_query = None
+    wallet_ids = set()
+    if batch.delete:
+        entries_query = select(BudgetList).where(BudgetList.id.in_(batch.delete), BudgetList.type_budget == type_budget)
+        if not principal.is_admin:
+            entries_query = entries_query.where(BudgetList.user_id == principal.id)
+        # здесь только кошельки для блокировки, сами записи читаются ниже под блокировкой
+        result = await db.execute(entries_query.with_only_columns(BudgetList.wallet_id).distinct())
+        wallet_ids = {wallet_id for wallet_id in result.scalars().all() if wallet_id is not None}
+
+    references = await load_references(db, principal.id, type_budget, batch.create) if batch.create else None
+
+    if references is not None:
+        wallet_ids |= {item.wallet_id for item in batch.create if references.error(item) is None}
+
+    wallets = await lock_wallets(db, wallet_ids)
+
+    # FOR UPDATE после блокировки кошельков, в том же порядке, что и у остальных записей:
+    # параллельная пачка с теми же id ждет здесь и после нашего commit уже не увидит удаленные строки,
+    # поэтому возврат средств и хуки считаются один раз
+    entries = {}
+    if entries_query is not None:
+        result = await db.execute(entries_query.with_for_update())
+        entries = {entry.id: entry for entry in result.scalars().all()}
+    balances = {wallet_id: value for wallet_id, (_, value) in wallets.items()}
+    deltas = defaultdict(float)
+
+    deleted = []
+    for result_item in delete_results:
+        entry = entries.get(result_item.id)
+        if entry is None:
+            result_item.detail = "Запись не найдена"
+            continue
+        if entry.id in deleted:
+            result_item.detail = "Запись уже удалена в этой пачке"
+            continue
+        if entry.wallet_id is not None and entry.wallet_id not in wallet_ids:
+            # кошелек записи сменили между чтением и блокировкой, он не заблокирован
+            result_item.detail = "Запись изменена, повторите запрос"
+            continue
+        if entry.wallet_id in balances:
+            refund = -sign * entry.value * (entry.currency_value or 1)
+            deltas[entry.wallet_id] += refund
+            balances[entry.wallet_id] += refund
+        deleted.append(entry.id)
+        result_item.status = BatchItemStatus.DELETED
+
+    new_entries = []
+    for item, result_item in zip(batch.create, create_results):
+        error = references.error(item)
+        if error is None and item.wallet_id not in balances:
+            error = ("wallet_id", "Данного кошелька не существует")
+        if error is not None:
+            result_item.detail = error[1]
+            continue
+
+        currency_value = references.currency_value(item)
+        change = sign * item.value * currency_value
+        if type_budget == 'expense' and balances[item.wallet_id] + change < 0:
+            result_item.detail = "Недостаточно средств"
+            continue
+
+        deltas[item.wallet_id] += change
+        balances[item.wallet_id] += change
+        new_entries.append((result_item, BudgetList(
+            name=item.name,
+            description=item.description,
+            date=item.date,
+            value=item.value,
+            currency=item.currency,
+            content=item.content,
+            user_id=principal.id,
+            type_id=item.type_id,
+            currency_value=currency_value,
+            wallet_id=item.wallet_id,
+            type_budget=type_budget
+        )))
+
+    if deleted:
+        deleted_counts = Counter((entries[entry_id].user_id, type_budget) for entry_id in deleted)
+        await on_entries_deleted(db, deleted_counts, BudgetList.id.in_(deleted))
+        await db.execute(delete(BudgetList).where(BudgetList.id.in_(deleted)))
+
+    for wallet_id in sorted(deltas):
+        if deltas[wallet_id]:
+            await change_wallet_value(db, wallet_id, wallets[wallet_id][0], deltas[wallet_id])
+
+    if new_entries:
+        db.add_all([entry for _, entry in new_entries])
+        await db.flush()
+        await on_entries_created(db, {(principal.id, type_budget): len(new_entries)},
+                                 BudgetList.id.in_([entry.id for _, entry in new_entries]))
+        for result_item, entry in new_entries:
+            result_item.id = entry.id
+            result_item.status = BatchItemStatus.CREATED
+
+    await db.commit()
+
+    return BatchResponse(items=delete_results + create_results)
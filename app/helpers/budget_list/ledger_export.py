@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator
+
+from dotenv import load_dotenv
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.Models.budget_list.budget_list import ExportFormat
+from app.database.database import AsyncSessionLocal
+
+
+load_dotenv()
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+EXPORT_FIELDS = [
+    "id", "date", "name", "value", "currency", "description", "content",
+    "type_id", "currency_value", "wallet_id", "type_budget",
+]
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+def _row(entry) -> dict:
+    row = {field: getattr(entry, field) for field in EXPORT_FIELDS}
+    if isinstance(row["date"], datetime):
+        row["date"] = row["date"].isoformat()
+    return row
+
+
+def _csv_chunk(rows: list[dict], with_header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    if with_header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def _ndjson_chunk(rows: list[dict]) -> str:
+    return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+
+async def stream_ledger(
+        query: Select,
+        export_format: ExportFormat,
+        session_factory: async_sessionmaker = AsyncSessionLocal
+) -> AsyncIterator[str]:
+    """
+    Отдает записи пачками по EXPORT_BATCH_SIZE через серверный курсор.
+    Следующая пачка читается только после того, как StreamingResponse отправил предыдущую,
+    поэтому память не зависит от объема истории, а медленный клиент притормаживает чтение из базы.
+    Сессия открывается внутри генератора: сессия из Depends закрывается раньше, чем закончится отдача.
+    session_factory - та же база, что выбрала get_read_session_factory для запроса.
+    """
+    if export_format == ExportFormat.CSV:
+        yield _csv_chunk([], with_header=True)
+
+    async with session_factory() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.scalars().partitions():
+            rows = [_row(entry) for entry in partition]
+            if export_format == ExportFormat.CSV:
+                yield _csv_chunk(rows)
+            else:
+                yield _ndjson_chunk(rows)
@@ -0,0 +1,40 @@
+from datetime import datetime, time, timedelta, timezone
+from typing import List
+
+from fastapi import HTTPException
+
+from app.Models.budget_list.budget_list import BudgetListFilter
+from app.Models.budget_list.budget_list_alchemy import BudgetList
+
+
+def filter_conditions(filters: BudgetListFilter, model=BudgetList) -> List:
+    """
+    Условия WHERE по фильтрам списка для model (BudgetList или BudgetListArchive).
+    Даты - границы суток в UTC, как у агрегатов ledger_rollup, date_to включается целиком.
+    """
+    if filters.date_from and filters.date_to and filters.date_from > filters.date_to:
+        raise HTTPException(status_code=400, detail="Начальная дата позже конечной")
+    if filters.value_min is not None and filters.value_max is not None and filters.value_min > filters.value_max:
+        raise HTTPException(status_code=400, detail="Минимальная сумма больше максимальной")
+
+    conditions = []
+    if filters.date_from is not None:
+        conditions.append(model.date >= datetime.combine(filters.date_from, time.min, tzinfo=timezone.utc))
+    if filters.date_to is not None:
+        end = datetime.combine(filters.date_to + timedelta(days=1), time.min, tzinfo=timezone.utc)
+        conditions.append(model.date < end)
+    if filters.wallet_id is not None:
+        conditions.append(model.wallet_id == filters.wallet_id)
+    if filters.type_id is not None:
+        conditions.append(model.type_id == filters.type_id)
+    if filters.currency is not None:
+        conditions.append(model.currency == filters.currency)
+    if filters.value_min is not None:
+        conditions.append(model.value >= filters.value_min)
+    if filters.value_max is not None:
+        conditions.append(model.value <= filters.value_max)
+    return conditions
+
+
+def has_filters(filters: BudgetListFilter) -> bool:
+    return any(value is not None for value in filters.model_dump().values())
@@ -0,0 +1,71 @@
+from typing import Dict, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.budget_list.budget_list_alchemy import BudgetList
+from app.helpers.budget_list.ledger_rollup import apply_rollup, apply_rollups_from_rows
+from app.helpers.other.data_version import bump_version
+from app.helpers.other.entity_counter import bump_counter
+from app.helpers.wallet.balance_index import apply_balance, apply_balances_from_rows
+
+
+def entry_snapshot(entry: BudgetList) -> BudgetList:
+    """
+    Отсоединенная копия записи до изменения, чтобы хуки могли вычесть ее старое состояние.
+    Вычисляемые колонки (search_vector) не копируются: они отложены и их загрузка потребовала бы запроса.
+    """
+    return BudgetList(**{
+        column.key: getattr(entry, column.key)
+        for column in BudgetList.__table__.columns
+        if column.computed is None
+    })
+
+
+async def on_entry_created(db: AsyncSession, entry: BudgetList):
+    """
+    Хуки пишут только новые строки журналов: потоки балансов и события версий - всегда,
+    счетчик и агрегат - в режиме WALLET_LEDGER_MODE. Без него счетчик и агрегат обновляют
+    общие строки entity_counter и ledger_rollup, и записи одного пользователя ждут друг друга.
+    """
+    await bump_counter(db, BudgetList, entry.user_id, 1, entry.type_budget)
+    await apply_rollup(db, entry, 1)
+    await apply_balance(db, entry, 1)
+    await bump_version(db, entry.type_budget, entry.user_id)
+
+
+async def on_entry_updated(db: AsyncSession, old_entry: BudgetList, entry: BudgetList):
+    await apply_rollup(db, old_entry, -1)
+    await apply_rollup(db, entry, 1)
+    await apply_balance(db, old_entry, -1)
+    await apply_balance(db, entry, 1)
+    await bump_version(db, entry.type_budget, entry.user_id)
+
+
+async def on_entry_deleted(db: AsyncSession, entry: BudgetList):
+    await bump_counter(db, BudgetList, entry.user_id, -1, entry.type_budget)
+    await apply_rollup(db, entry, -1)
+    await apply_balance(db, entry, -1)
+    await bump_version(db, entry.type_budget, entry.user_id)
+
+
+async def on_entries_created(db: AsyncSession, counts: Dict[Tuple[int, str], int], where):
+    """
+    Пакетный вариант on_entry_created: counts - число новых строк по (user_id, type_budget),
+    where - условие, выбирающее ровно эти строки. Вызывается после вставки.
+    """
+    for (user_id, type_budget), total in counts.items():
+        await bump_counter(db, BudgetList, user_id, total, type_budget)
+        await bump_version(db, type_budget, user_id)
+    await apply_rollups_from_rows(db, where)
+    await apply_balances_from_rows(db, where)
+
+
+async def on_entries_deleted(db: AsyncSession, counts: Dict[Tuple[int, str], int], where):
+    """
+    Пакетный вариант on_entry_deleted. Вызывается до удаления, пока строки еще можно выбрать по where.
+    """
+    for (user_id, type_budget), total in counts.items():
+        await bump_counter(db, BudgetList, user_id, -total, type_budget)
+        await bump_version(db, type_budget, user_id)
+    await apply_rollups_from_rows(db, where, sign=-1)
+    await apply_balances_from_rows(db, where, sign=-1)
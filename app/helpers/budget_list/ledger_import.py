@@ -0,0 +1,193 @@
+import csv
+import hashlib
+import io
+import json
+import os
+from collections import defaultdict
+from datetime import timezone
+from typing import List
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import and_, column, select, table, text, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.budget_list.budget_list import BudgetListCreate, ImportResponse
+from app.Models.budget_list.budget_list_alchemy import BudgetList
+from app.Models.budget_list.budget_list_archive_alchemy import BudgetListArchive
+from app.helpers.budget_list.ledger_hooks import on_entries_created
+from app.helpers.budget_list.ledger_references import load_references
+from app.helpers.wallet.change_wallet_value import change_wallet_value
+
+
+load_dotenv()
+
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "10000"))
+
+IMPORT_COLUMNS = [
+    "date", "name", "value", "currency", "description", "content", "type_budget",
+    "user_id", "type_id", "currency_value", "wallet_id", "content_hash",
+]
+
+# строки сначала копируются сюда, а в budget_list переносятся через ON CONFLICT DO NOTHING
+IMPORT_STAGING_TABLE = "budget_list_import"
+
+IMPORT_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"type": "array", "items": {"$ref": "#/components/schemas/BudgetListCreate"}}
+            },
+            "text/csv": {"schema": {"type": "string"}},
+        },
+    }
+}
+
+
+async def parse_import_body(request: Request) -> List[BudgetListCreate]:
+    """
+    Читает тело запроса как JSON-массив или CSV (заголовки как в выгрузке /export, лишние колонки игнорируются).
+    """
+    raw = await request.body()
+    try:
+        if "csv" in request.headers.get("content-type", ""):
+            rows = list(csv.DictReader(io.StringIO(raw.decode("utf-8-sig"))))
+            for row in rows:
+                if row.get("content") == "":
+                    row["content"] = None
+        else:
+            rows = json.loads(raw)
+    except (UnicodeDecodeError, ValueError, csv.Error):
+        raise HTTPException(status_code=400, detail="Не удалось разобрать файл импорта")
+
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Ожидается массив записей")
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Не больше {IMPORT_MAX_ROWS} записей за один импорт")
+
+    items = []
+    errors = []
+    for number, row in enumerate(rows, start=1):
+        try:
+            items.append(BudgetListCreate.model_validate(row))
+        except ValidationError as e:
+            errors.extend(
+                {"row": number, "field": ".".join(map(str, error["loc"])), "message": error["msg"]}
+                for error in e.errors()
+            )
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return items
+
+
+def _content_hashes(user_id: int, type_budget: str, items: List[BudgetListCreate]) -> List[str]:
+    """
+    Хэш содержимого строки плюс номер ее повтора в файле: две одинаковые покупки за день
+    остаются двумя записями, а повторный импорт того же файла дает те же хэши.
+    """
+    hashes = []
+    seen = defaultdict(int)
+    for item in items:
+        date = item.date if item.date.tzinfo else item.date.replace(tzinfo=timezone.utc)
+        payload = json.dumps([
+            user_id, type_budget, date.astimezone(timezone.utc).isoformat(), item.name, item.value,
+            item.currency, item.description, item.content, item.type_id, item.wallet_id,
+        ], ensure_ascii=False, separators=(",", ":"))
+        seen[payload] += 1
+        hashes.append(hashlib.sha256(f"{payload}#{seen[payload]}".encode("utf-8")).hexdigest())
+    return hashes
+
+
+async def import_entries(
+        db: AsyncSession,
+        user_id: int,
+        type_budget: str,
+        items: List[BudgetListCreate]
+) -> ImportResponse:
+    """
+    Загружает записи пачкой: ссылки и курсы проверяются один раз на весь файл (load_references),
+    строки копируются через COPY во временную таблицу и переносятся в budget_list с ON CONFLICT DO NOTHING
+    по уникальному content_hash. Параллельный импорт того же файла не создаст дублей: пропущенными
+    считаются все строки, которые не вставились, а кошельки меняются только на вставленные.
+    """
+    hashes = _content_hashes(user_id, type_budget, items)
+
+    # уже импортированные строки могли уйти в архив, поэтому проверяются обе таблицы
+    existing_result = await db.execute(union_all(*(
+        select(model.content_hash).where(model.user_id == user_id, model.content_hash.in_(hashes))
+        for model in (BudgetList, BudgetListArchive)
+    )))
+    existing = set(existing_result.scalars().all())
+    rows = [
+        (number, item, content_hash)
+        for number, (item, content_hash) in enumerate(zip(items, hashes), start=1)
+        if content_hash not in existing
+    ]
+    if not rows:
+        return ImportResponse(imported=0, skipped=len(items))
+
+    references = await load_references(db, user_id, type_budget, (item for _, item, _ in rows))
+    errors = []
+    for number, item, _ in rows:
+        error = references.error(item)
+        if error is not None:
+            errors.append({"row": number, "field": error[0], "message": error[1]})
+    if errors:
+        raise HTTPException(status_code=400, detail=errors)
+
+    records = []
+    for _, item, content_hash in rows:
+        date = item.date if item.date.tzinfo else item.date.replace(tzinfo=timezone.utc)
+        records.append((
+            date, item.name, item.value, item.currency, item.description, item.content, type_budget,
+            user_id, item.type_id, references.currency_value(item), item.wallet_id, content_hash,
+        ))
+
+    await db.execute(text(
+        f"CREATE TEMP TABLE {IMPORT_STAGING_TABLE} ON COMMIT DROP AS "
+        f"SELECT {', '.join(IMPORT_COLUMNS)} FROM {BudgetList.__tablename__} WITH NO DATA"
+    ))
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        IMPORT_STAGING_TABLE, records=records, columns=IMPORT_COLUMNS
+    )
+
+    staging = table(IMPORT_STAGING_TABLE, *(column(name) for name in IMPORT_COLUMNS))
+    result = await db.execute(
+        insert(BudgetList)
+        .from_select(IMPORT_COLUMNS, select(*staging.c))
+        .on_conflict_do_nothing(
+            index_elements=[BudgetList.user_id, BudgetList.content_hash, BudgetList.date],
+            index_where=BudgetList.content_hash.is_not(None)
+        )
+        .returning(BudgetList.wallet_id, BudgetList.value, BudgetList.currency_value, BudgetList.content_hash)
+    )
+    inserted = result.all()
+    skipped = len(items) - len(inserted)
+    if not inserted:
+        await db.commit()
+        return ImportResponse(imported=0, skipped=skipped)
+
+    sign = -1 if type_budget == 'expense' else 1
+    deltas = defaultdict(float)
+    for wallet_id, value, currency_value, _ in inserted:
+        deltas[wallet_id] += sign * float(value) * (currency_value or 1)
+
+    for wallet_id in sorted(deltas):
+        wallet_value = await change_wallet_value(db, wallet_id, user_id, deltas[wallet_id],
+                                                 check_funds=type_budget == 'expense')
+        if wallet_value is None:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail=f"Недостаточно средств в кошельке {wallet_id}")
+
+    await on_entries_created(db, {(user_id, type_budget): len(inserted)}, and_(
+        BudgetList.user_id == user_id,
+        BudgetList.content_hash.in_([content_hash for _, _, _, content_hash in inserted])
+    ))
+    await db.commit()
+
+    return ImportResponse(imported=len(inserted), skipped=skipped)
@@ -0,0 +1,193 @@
+import asyncio
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import List, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import cast, column, delete, exists, func, insert, literal_column, select, table, text, Date
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.budget_list.budget_list_alchemy import BudgetList
+from app.database.database import AsyncSessionLocal
+from app.helpers.other.data_version import bump_version
+from app.helpers.other.entity_counter import bump_counter
+
+
+load_dotenv()
+
+BUDGET_LIST_PARTITIONED = os.getenv("BUDGET_LIST_PARTITIONED", "false").lower() in ("1", "true", "yes")
+PARTITION_MONTHS_AHEAD = int(os.getenv("BUDGET_LIST_PARTITION_MONTHS_AHEAD", "3"))
+# 0 - старые партиции не отсоединяются
+PARTITION_RETENTION_MONTHS = int(os.getenv("BUDGET_LIST_PARTITION_RETENTION_MONTHS", "0"))
+PARTITION_MAINTENANCE_INTERVAL = float(os.getenv("BUDGET_LIST_PARTITION_INTERVAL", "3600"))
+
+PARTITION_LOCK_NAMESPACE = 1003
+PARTITION_NAME_RE = re.compile(r"^budget_list_y(\d{4})m(\d{2})$")
+DEFAULT_PARTITION = f"{BudgetList.__tablename__}_default"
+# search_vector вычисляемый, при переносе строк его пересчитает сама партиция
+MOVED_COLUMNS = [column_.name for column_ in BudgetList.__table__.columns if column_.computed is None]
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"budget_list_y{month.year}m{month.month:02d}"
+
+
+def create_partition_sql(month: date) -> str:
+    """
+    Партиция на календарный месяц по UTC, как периоды в ledger_rollup.
+    """
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {BudgetList.__tablename__} "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+    )
+
+
+def month_bounds(month: date) -> Tuple[datetime, datetime]:
+    return (
+        datetime(month.year, month.month, 1, tzinfo=timezone.utc),
+        datetime.combine(add_months(month, 1), datetime.min.time(), tzinfo=timezone.utc)
+    )
+
+
+def upcoming_months(today: date, months_ahead: int = PARTITION_MONTHS_AHEAD) -> List[date]:
+    current = month_start(today)
+    return [add_months(current, offset) for offset in range(months_ahead + 1)]
+
+
+async def is_partitioned(db: AsyncSession) -> bool:
+    result = await db.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": BudgetList.__tablename__}
+    )
+    return bool(result.scalar())
+
+
+async def attached_partitions(db: AsyncSession) -> List[Tuple[str, date]]:
+    result = await db.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(:table)"
+        ),
+        {"table": BudgetList.__tablename__}
+    )
+    partitions = []
+    for name in result.scalars().all():
+        match = PARTITION_NAME_RE.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+async def default_partition_months(db: AsyncSession) -> List[date]:
+    """
+    Месяцы, строки которых лежат в партиции по умолчанию: для них тоже нужны свои партиции.
+    """
+    result = await db.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": DEFAULT_PARTITION})
+    if not result.scalar():
+        return []
+    default = table(DEFAULT_PARTITION, column("date"))
+    month = cast(func.date_trunc(literal_column("'month'"), func.timezone(literal_column("'UTC'"), default.c.date)), Date)
+    result = await db.execute(select(month).distinct())
+    return sorted(result.scalars().all())
+
+
+async def create_partition(db: AsyncSession, month: date):
+    """
+    Создает партицию месяца. Если в партиции по умолчанию уже есть строки этого месяца,
+    Postgres не даст создать партицию рядом с ней: default отсоединяется, строки переносятся
+    в новую партицию, default присоединяется обратно. Все в одной транзакции вызывающего.
+    """
+    lower, upper = month_bounds(month)
+    default = table(DEFAULT_PARTITION, *(column(name) for name in MOVED_COLUMNS))
+    in_month = (default.c.date >= lower, default.c.date < upper)
+
+    result = await db.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": DEFAULT_PARTITION})
+    if not result.scalar() or not (await db.execute(select(exists().where(*in_month)))).scalar():
+        await db.execute(text(create_partition_sql(month)))
+        return
+
+    await db.execute(text(f"ALTER TABLE {BudgetList.__tablename__} DETACH PARTITION {DEFAULT_PARTITION}"))
+    await db.execute(text(create_partition_sql(month)))
+    partition = table(partition_name(month), *(column(name) for name in MOVED_COLUMNS))
+    moved = delete(default).where(*in_month).returning(*default.c).cte("moved")
+    await db.execute(insert(partition).from_select(MOVED_COLUMNS, select(*moved.c)))
+    await db.execute(text(f"ALTER TABLE {BudgetList.__tablename__} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+
+async def detach_partition(db: AsyncSession, name: str):
+    """
+    Отсоединяет партицию: таблица остается в базе, но пропадает из списков.
+    Счетчики и версии данных пользователей уменьшаются в той же транзакции.
+    Агрегаты ledger_rollup и индекс балансов не трогаются - это история кошелька.
+    """
+    partition = table(name, column("user_id"), column("type_budget"))
+    result = await db.execute(
+        select(partition.c.user_id, partition.c.type_budget, func.count())
+        .group_by(partition.c.user_id, partition.c.type_budget)
+    )
+    for user_id, type_budget, count in result.all():
+        await bump_counter(db, BudgetList, user_id, -count, type_budget)
+        await bump_version(db, type_budget, user_id)
+
+    await db.execute(text(f"ALTER TABLE {BudgetList.__tablename__} DETACH PARTITION {name}"))
+
+
+async def maintain_partitions(db: AsyncSession, today: date | None = None) -> Tuple[int, int]:
+    """
+    Создает партиции на текущий и PARTITION_MONTHS_AHEAD следующих месяцев и на месяцы,
+    строки которых попали в партицию по умолчанию; отсоединяет партиции старше PARTITION_RETENTION_MONTHS. DDL выполняется под advisory lock,
+    чтобы несколько процессов не делали его одновременно.
+    Возвращает (создано, отсоединено).
+    """
+    if not await is_partitioned(db):
+        return 0, 0
+
+    today = today or date.today()
+    existing = {name for name, _ in await attached_partitions(db)}
+    months = sorted(set(upcoming_months(today)) | set(await default_partition_months(db)))
+    await db.commit()
+
+    created = 0
+    for month in months:
+        if partition_name(month) in existing:
+            continue
+        await db.execute(select(func.pg_advisory_xact_lock(PARTITION_LOCK_NAMESPACE, 0)))
+        await create_partition(db, month)
+        await db.commit()
+        created += 1
+
+    detached = 0
+    if PARTITION_RETENTION_MONTHS > 0:
+        horizon = add_months(month_start(today), -PARTITION_RETENTION_MONTHS)
+        await db.execute(select(func.pg_advisory_xact_lock(PARTITION_LOCK_NAMESPACE, 0)))
+        for name, month in await attached_partitions(db):
+            if month >= horizon:
+                break
+            await detach_partition(db, name)
+            detached += 1
+        await db.commit()
+
+    return created, detached
+
+
+async def run_partition_maintenance(interval: float = PARTITION_MAINTENANCE_INTERVAL):
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await maintain_partitions(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Ошибка обслуживания партиций budget_list: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,70 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.budget_list.budget_list import BudgetListCreate
+from app.Models.wallet.wallet_model_alchemy import Wallet
+from app.helpers.other.currency_catalog import currency_catalog
+from app.helpers.other.get_currency import get_rate
+from app.helpers.other.type_catalog import type_catalog
+
+
+@dataclass
+class LedgerReferences:
+    wallets: Dict[int, int]
+    types: Set[int]
+    currencies: Dict[int, str]
+    rates: Dict[Tuple[str, str], float]
+
+    def error(self, item: BudgetListCreate) -> Tuple[str, str] | None:
+        if item.wallet_id not in self.wallets:
+            return "wallet_id", "Данного кошелька не существует"
+        if item.type_id not in self.types:
+            return "type_id", "Данного типа не существует"
+        if item.currency not in self.currencies:
+            return "currency", "Данной валюты не существует"
+        return None
+
+    def currency_value(self, item: BudgetListCreate) -> float:
+        return self.rates[(self.currencies[item.currency], self.currencies[self.wallets[item.wallet_id]])]
+
+
+async def load_references(
+        db: AsyncSession,
+        user_id: int,
+        type_budget: str,
+        items: Iterable[BudgetListCreate]
+) -> LedgerReferences:
+    """
+    Проверяет кошельки одним запросом, типы и валюты - по справочникам в памяти.
+    Каждая пара валют запрашивается один раз.
+    Записи с ошибкой (см. LedgerReferences.error) в курсы не попадают.
+    """
+    items = list(items)
+
+    wallet_result = await db.execute(
+        select(Wallet.id, Wallet.currency_id).where(
+            Wallet.user_id == user_id,
+            Wallet.id.in_({item.wallet_id for item in items})
+        )
+    )
+    wallets = dict(wallet_result.all())
+
+    catalog = await type_catalog.get_many(db, {item.type_id for item in items})
+    types = {type_id for type_id, (kind, _) in catalog.items() if kind == type_budget}
+
+    catalog_currencies = await currency_catalog.get_many(db, {item.currency for item in items} | set(wallets.values()))
+    currencies = {currency_id: currency.short_name for currency_id, currency in catalog_currencies.items()}
+
+    references = LedgerReferences(wallets, types, currencies, {})
+    pairs: List[Tuple[str, str]] = list({
+        (currencies[item.currency], currencies[wallets[item.wallet_id]])
+        for item in items
+        if references.error(item) is None
+    })
+    quotes = await asyncio.gather(*(get_rate(source, target) for source, target in pairs))
+    references.rates = {pair: quote.quotes[quote.fields] for pair, quote in zip(pairs, quotes)}
+    return references
@@ -0,0 +1,37 @@
+from typing import List, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.budget_list.budget_list import BudgetListResponse
+from app.Models.budget_list.budget_list_alchemy import BudgetList
+from app.helpers.other.type_catalog import type_catalog
+
+
+async def budget_responses(db: AsyncSession, budgets: Sequence[BudgetList]) -> List[BudgetListResponse]:
+    """
+    Собирает ответы по записям, тип берется из type_catalog только если он совпадает с type_budget записи.
+    """
+    types = await type_catalog.get_many(db, {b.type_id for b in budgets if b.type_id})
+
+    budgets_list = []
+    for budget in budgets:
+        type_data = None
+        if budget.type_id in types:
+            type_budget, type_response = types[budget.type_id]
+            if type_budget == budget.type_budget:
+                type_data = type_response
+
+        budgets_list.append(BudgetListResponse(
+            id=budget.id,
+            date=budget.date,
+            name=budget.name,
+            value=budget.value,
+            currency=budget.currency,
+            description=budget.description,
+            content=budget.content,
+            type=type_data,
+            currency_value=budget.currency_value,
+            wallet_id=budget.wallet_id,
+            type_budget=budget.type_budget
+        ))
+    return budgets_list
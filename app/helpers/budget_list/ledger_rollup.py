@@ -0,0 +1,195 @@
+from datetime import datetime, timezone, date
+
+from sqlalchemy import select, func, delete, literal, literal_column, cast, Date, true, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.budget_list.budget_list_alchemy import BudgetList
+from app.Models.budget_list.budget_list_archive_alchemy import BudgetListArchive
+from app.Models.ledger_rollup.ledger_rollup_alchemy import LedgerRollup
+from app.Models.ledger_rollup.ledger_rollup_delta_alchemy import LedgerRollupDelta
+from app.helpers.wallet.wallet_ledger import WALLET_LEDGER_MODE
+
+ROLLUP_PERIODS = ("day", "month")
+ROLLUP_COLUMNS = ["user_id", "wallet_id", "type_budget", "type_id", "period", "period_start", "total", "count"]
+ROLLUP_KEY = [
+    LedgerRollup.user_id,
+    LedgerRollup.wallet_id,
+    LedgerRollup.type_budget,
+    LedgerRollup.type_id,
+    LedgerRollup.period,
+    LedgerRollup.period_start,
+]
+
+
+def period_start(value: datetime, period: str) -> date:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    if period == "month":
+        return value.date().replace(day=1)
+    return value.date()
+
+
+def _upsert_totals(stmt):
+    return stmt.on_conflict_do_update(
+        index_elements=ROLLUP_KEY,
+        set_={
+            "total": LedgerRollup.total + stmt.excluded.total,
+            "count": LedgerRollup.count + stmt.excluded.count,
+        }
+    )
+
+
+def _add_totals(rows=None, query=None, journal: bool = WALLET_LEDGER_MODE):
+    """
+    Запрос, добавляющий суммы к агрегатам: строками rows или результатом query.
+
+    Upsert строк ledger_rollup держит их блокировки до commit: записи одного пользователя в один кошелек
+    и тип за один день или месяц выполняются по очереди. В режиме WALLET_LEDGER_MODE (journal=True)
+    суммы вместо этого добавляются строками в ledger_rollup_delta, их переносит compact_rollups.
+    """
+    model = LedgerRollupDelta if journal else LedgerRollup
+    stmt = insert(model).values(rows) if query is None else insert(model).from_select(ROLLUP_COLUMNS, query)
+    return stmt if journal else _upsert_totals(stmt)
+
+
+async def apply_rollup(db: AsyncSession, entry: BudgetList, sign: int):
+    """
+    Добавляет (sign=1) или вычитает (sign=-1) запись из дневного и месячного агрегата.
+    Сумма считается в валюте кошелька: value * currency_value.
+    """
+    if entry.date is None:
+        return
+
+    amount = entry.value * (entry.currency_value or 1)
+    rows = [
+        {
+            "user_id": entry.user_id,
+            "wallet_id": entry.wallet_id or 0,
+            "type_budget": entry.type_budget,
+            "type_id": entry.type_id or 0,
+            "period": period,
+            "period_start": period_start(entry.date, period),
+            "total": sign * amount,
+            "count": sign,
+        }
+        for period in ROLLUP_PERIODS
+    ]
+    await db.execute(_add_totals(rows))
+
+
+async def apply_rollups_from_rows(
+        db: AsyncSession,
+        where=None,
+        sign: int = 1,
+        model=BudgetList,
+        journal: bool = WALLET_LEDGER_MODE
+):
+    """
+    Добавляет (sign=1) или вычитает (sign=-1) из агрегатов все строки model (budget_list или архива),
+    подходящие под where, одним INSERT ... SELECT на период. journal=False пишет прямо в ledger_rollup.
+    """
+    for period in ROLLUP_PERIODS:
+        # GROUP BY должен совпадать с SELECT дословно, поэтому константы без bind-параметров
+        utc_date = func.timezone(literal_column("'UTC'"), model.date)
+        period_start_column = cast(func.date_trunc(literal_column(f"'{period}'"), utc_date), Date)
+        wallet_column = func.coalesce(model.wallet_id, literal_column("0"))
+        type_column = func.coalesce(model.type_id, literal_column("0"))
+        query = select(
+            model.user_id,
+            wallet_column,
+            model.type_budget,
+            type_column,
+            literal(period),
+            period_start_column,
+            func.sum(model.value * func.coalesce(model.currency_value, 1)) * sign,
+            func.count() * sign,
+        ).where(
+            model.date.is_not(None),
+            where if where is not None else true()
+        ).group_by(
+            model.user_id,
+            wallet_column,
+            model.type_budget,
+            type_column,
+            period_start_column,
+        )
+        await db.execute(_add_totals(query=query, journal=journal))
+
+
+async def rebuild_rollups(db: AsyncSession):
+    """
+    Агрегаты считаются по живым и архивным записям: архивирование их не меняет.
+    Журнал изменений очищается: все его строки уже учтены в записях.
+    """
+    await db.execute(delete(LedgerRollupDelta))
+    await db.execute(delete(LedgerRollup))
+    await apply_rollups_from_rows(db, journal=False)
+    await apply_rollups_from_rows(db, model=BudgetListArchive, journal=False)
+    await db.commit()
+
+
+async def compact_rollups(db: AsyncSession) -> int:
+    """
+    Переносит ledger_rollup_delta в ledger_rollup одним запросом (DELETE ... RETURNING внутри upsert).
+    Возвращает количество обновленных агрегатов.
+    """
+    moved = delete(LedgerRollupDelta).returning(
+        *(LedgerRollupDelta.__table__.c[name] for name in ROLLUP_COLUMNS)
+    ).cte("moved")
+    key = [moved.c[column.key] for column in ROLLUP_KEY]
+    stmt = _upsert_totals(insert(LedgerRollup).from_select(
+        ROLLUP_COLUMNS,
+        select(*key, func.sum(moved.c.total), func.sum(moved.c.count)).group_by(*key)
+    )).returning(LedgerRollup.user_id)
+    result = await db.execute(stmt)
+    count = len(result.all())
+    await db.commit()
+    return count
+
+
+async def read_summary(
+        db: AsyncSession,
+        user_id: int,
+        type_budget: str,
+        period: str,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        wallet_id: int | None = None
+) -> list[dict]:
+    def branch(rollup):
+        query = select(*(rollup.__table__.c[name] for name in ROLLUP_COLUMNS)).where(
+            rollup.user_id == user_id,
+            rollup.type_budget == type_budget,
+            rollup.period == period
+        )
+        if date_from is not None:
+            query = query.where(rollup.period_start >= period_start(datetime.combine(date_from, datetime.min.time()), period))
+        if date_to is not None:
+            query = query.where(rollup.period_start <= date_to)
+        if wallet_id is not None:
+            query = query.where(rollup.wallet_id == wallet_id)
+        return query
+
+    # еще не свернутые изменения из ledger_rollup_delta складываются с агрегатами
+    rollups = union_all(branch(LedgerRollup), branch(LedgerRollupDelta)).subquery()
+    key = [rollups.c.period_start, rollups.c.wallet_id, rollups.c.type_id]
+    count = func.sum(rollups.c.count)
+    query = (
+        select(*key, func.sum(rollups.c.total), count)
+        .group_by(*key)
+        .having(count != 0)
+        .order_by(*key)
+    )
+    result = await db.execute(query)
+
+    return [
+        {
+            "period_start": start,
+            "wallet_id": wallet or None,
+            "type_id": type_id or None,
+            "total": total,
+            "count": total_count,
+        }
+        for start, wallet, type_id, total, total_count in result.all()
+    ]
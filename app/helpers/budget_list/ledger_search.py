@@ -0,0 +1,72 @@
+import re
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import cast, func, select
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.budget_list.budget_list import BudgetSearchItem, BudgetSearchResponse
+from app.Models.budget_list.budget_list_alchemy import BudgetList
+from app.Models.other.enums import SortDirection
+from app.helpers.auth.principal import Principal
+from app.helpers.budget_list.ledger_response import budget_responses
+from app.helpers.other.cursor_pagination import decode_cursor, encode_cursor, keyset_condition
+
+SEARCH_SORT_FIELD = "rank"
+SEARCH_MAX_TERMS = 16
+
+
+def build_tsquery(text: str) -> str:
+    """
+    Каждое слово запроса ищется как префикс, все слова обязательны: "прод магаз" -> "прод:* & магаз:*".
+    Спецсимволы tsquery в запрос не попадают, поэтому to_tsquery не падает на пользовательском вводе.
+    """
+    terms = re.findall(r"\w+", text.lower())[:SEARCH_MAX_TERMS]
+    if not terms:
+        raise HTTPException(status_code=400, detail="Пустой поисковый запрос")
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+async def search_entries(
+        db: AsyncSession,
+        principal: Principal,
+        type_budget: str,
+        text: str,
+        per_page: int,
+        cursor: str | None = None
+) -> BudgetSearchResponse:
+    """
+    Полнотекстовый поиск по name, description и content через GIN-индекс на search_vector.
+    Порядок - по рангу и id по убыванию, страницы только вперед по курсору.
+    Администратор, как и в списке, ищет по всем записям.
+    """
+    tsquery = func.to_tsquery(cast("simple", REGCONFIG), build_tsquery(text))
+    rank = func.ts_rank(BudgetList.search_vector, tsquery).label(SEARCH_SORT_FIELD)
+
+    query = select(BudgetList, rank).where(BudgetList.search_vector.op("@@")(tsquery))
+    if not principal.is_admin:
+        query = query.where(BudgetList.user_id == principal.id, BudgetList.type_budget == type_budget)
+
+    if cursor:
+        payload = decode_cursor(cursor, SEARCH_SORT_FIELD, SortDirection.DESC)
+        query = query.where(keyset_condition(rank, BudgetList.id, payload["v"], payload["id"], True))
+
+    query = query.order_by(rank.desc(), BudgetList.id.desc()).limit(per_page + 1)
+    rows = (await db.execute(query)).all()
+
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    responses = await budget_responses(db, [budget for budget, _ in rows])
+    items = [
+        BudgetSearchItem(**response.model_dump(), rank=row_rank)
+        for response, (_, row_rank) in zip(responses, rows)
+    ]
+
+    next_cursor = None
+    if has_next:
+        last = SimpleNamespace(id=items[-1].id, rank=items[-1].rank)
+        next_cursor = encode_cursor(last, SEARCH_SORT_FIELD, SortDirection.DESC)
+
+    return BudgetSearchResponse(data=items, next_cursor=next_cursor)
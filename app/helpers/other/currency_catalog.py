@@ -0,0 +1,79 @@
+import asyncio
+import os
+import time
+from typing import Dict, Iterable, List
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.currency.currency_alchemy import CurrencyAlchemy
+from app.Models.currency.currency_model import CurrencyResponse
+
+
+load_dotenv()
+
+CURRENCY_CATALOG_TTL = float(os.getenv("CURRENCY_CATALOG_TTL", "300"))
+
+
+class CurrencyCatalog:
+    """
+    Таблица currency целиком в памяти процесса: id -> CurrencyResponse.
+
+    Каждое изменение валют через API увеличивает version. Если version изменилась во время загрузки,
+    таблица читается еще раз, поэтому после invalidate() справочник не вернется к старым данным.
+    ttl нужен для изменений, сделанных другими процессами.
+    """
+
+    def __init__(self, ttl: float = CURRENCY_CATALOG_TTL):
+        self.ttl = ttl
+        self.version = 0
+        self._by_id: Dict[int, CurrencyResponse] = {}
+        self._loaded_version: int | None = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def all(self, db: AsyncSession) -> List[CurrencyResponse]:
+        await self._ensure_loaded(db)
+        return list(self._by_id.values())
+
+    async def get(self, db: AsyncSession, currency_id: int) -> CurrencyResponse | None:
+        await self._ensure_loaded(db)
+        return self._by_id.get(currency_id)
+
+    async def get_many(self, db: AsyncSession, currency_ids: Iterable[int]) -> Dict[int, CurrencyResponse]:
+        await self._ensure_loaded(db)
+        return {currency_id: self._by_id[currency_id] for currency_id in currency_ids if currency_id in self._by_id}
+
+    async def short_name(self, db: AsyncSession, currency_id: int) -> str | None:
+        currency = await self.get(db, currency_id)
+        return currency.short_name if currency is not None else None
+
+    def invalidate(self):
+        self.version += 1
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_version == self.version and time.monotonic() - self._loaded_at < self.ttl
+
+    async def _ensure_loaded(self, db: AsyncSession):
+        if self._is_fresh():
+            return
+
+        async with self._lock:
+            while not self._is_fresh():
+                version = self.version
+                result = await db.execute(select(CurrencyAlchemy))
+                self._by_id = {
+                    currency.id: CurrencyResponse.model_construct(
+                        id=currency.id,
+                        name=currency.name,
+                        short_name=currency.short_name,
+                        value=currency.value
+                    )
+                    for currency in result.scalars().all()
+                }
+                self._loaded_version = version
+                self._loaded_at = time.monotonic()
+
+
+currency_catalog = CurrencyCatalog()
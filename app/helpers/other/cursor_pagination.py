@@ -0,0 +1,111 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.other.enums import SortDirection
+
+
+def encode_cursor(row: Any, sort_field: str, sort_direction: SortDirection, backwards: bool = False) -> str:
+    value = getattr(row, sort_field)
+    payload = {
+        "s": sort_field,
+        "d": sort_direction.value,
+        "b": backwards,
+        "id": row.id,
+        "v": value.isoformat() if isinstance(value, datetime) else value,
+        "t": "dt" if isinstance(value, datetime) else None,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_field: str, sort_direction: SortDirection) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["t"] == "dt":
+            payload["v"] = datetime.fromisoformat(payload["v"])
+        int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+    if payload["s"] != sort_field or payload["d"] != sort_direction.value:
+        raise HTTPException(status_code=400, detail="Курсор не соответствует параметрам сортировки")
+    return payload
+
+
+def keyset_order(column, id_column, descending: bool) -> tuple:
+    if descending:
+        return column.desc().nulls_first(), id_column.desc()
+    return column.asc().nulls_last(), id_column.asc()
+
+
+def keyset_condition(column, id_column, value: Any, row_id: int, descending: bool):
+    """
+    Условие "строго после (value, row_id)" для порядка из keyset_order.
+    NULL в сортируемой колонке идут в конце при ASC и в начале при DESC, как в Postgres по умолчанию.
+    """
+    if value is None:
+        if descending:
+            return or_(and_(column.is_(None), id_column < row_id), column.is_not(None))
+        return and_(column.is_(None), id_column > row_id)
+
+    if descending:
+        return or_(column < value, and_(column == value, id_column < row_id))
+    return or_(column > value, and_(column == value, id_column > row_id), column.is_(None))
+
+
+def build_cursors(
+        rows: Sequence[Any],
+        sort_field: str,
+        sort_direction: SortDirection,
+        has_next: bool,
+        has_prev: bool
+) -> Tuple[str | None, str | None]:
+    if not rows:
+        return None, None
+    next_cursor = encode_cursor(rows[-1], sort_field, sort_direction) if has_next else None
+    prev_cursor = encode_cursor(rows[0], sort_field, sort_direction, backwards=True) if has_prev else None
+    return next_cursor, prev_cursor
+
+
+async def fetch_keyset_page(
+        db: AsyncSession,
+        query: Select,
+        model: Any,
+        sort_field: str,
+        sort_direction: SortDirection,
+        cursor: str | None,
+        per_page: int
+) -> Tuple[List[Any], str | None, str | None]:
+    """
+    Выбирает страницу по курсору вместо OFFSET. Возвращает строки и курсоры соседних страниц.
+    """
+    column = getattr(model, sort_field)
+    descending = sort_direction == SortDirection.DESC
+    backwards = False
+
+    if cursor:
+        payload = decode_cursor(cursor, sort_field, sort_direction)
+        backwards = bool(payload["b"])
+        query = query.where(keyset_condition(column, model.id, payload["v"], payload["id"], descending != backwards))
+
+    query = query.order_by(*keyset_order(column, model.id, descending != backwards)).limit(per_page + 1)
+    result = await db.execute(query)
+    rows = list(result.scalars().all())
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, cursor is not None
+
+    next_cursor, prev_cursor = build_cursors(rows, sort_field, sort_direction, has_next, has_prev)
+    return rows, next_cursor, prev_cursor
@@ -0,0 +1,129 @@
+import hashlib
+from typing import Sequence
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import select, func, and_, or_, delete, literal, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.data_version.data_version_alchemy import DataVersion
+from app.Models.data_version.data_version_event_alchemy import DataVersionEvent
+from app.api.deps import get_read_db
+from app.database.replica import note_write
+from app.helpers.auth.principal import Principal, get_principal
+
+CURRENCY_SCOPE = "currency"
+WALLET_SCOPE = "wallet"
+# справочник типов доходов и затрат: общий для всех, входит в ответы списков
+TYPES_SCOPE = "types"
+# записи budget_list версионируются по своему type_budget
+LEDGER_SCOPES = ("expense", "income")
+
+
+def version_bump_statement(scope: str, user_id: int = 0):
+    return insert(DataVersionEvent).values(scope=scope, user_id=user_id)
+
+
+async def bump_version(db: AsyncSession, scope: str, user_id: int = 0):
+    """
+    Увеличивает версию данных scope пользователя: добавляет строку в data_version_event.
+    Общая строка data_version в транзакции записи не блокируется, поэтому записи одного пользователя
+    не ждут друг друга; в нее события переносит compact_versions.
+    Вызывается в той же транзакции, что и сама запись, и открывает пользователю окно read-your-writes после commit.
+    """
+    await db.execute(version_bump_statement(scope, user_id))
+    note_write(db, user_id)
+
+
+def _version_conditions(model, scopes: Sequence[str], user_id: int | None, shared_scopes: Sequence[str]):
+    conditions = []
+    if scopes:
+        own = model.scope.in_(scopes)
+        conditions.append(own if user_id is None else and_(own, model.user_id == user_id))
+    if shared_scopes:
+        conditions.append(and_(model.scope.in_(shared_scopes), model.user_id == 0))
+    return or_(*conditions)
+
+
+async def read_version(
+        db: AsyncSession,
+        scopes: Sequence[str],
+        user_id: int | None = None,
+        shared_scopes: Sequence[str] = ()
+) -> int:
+    """
+    Сумма версий: scopes пользователя (или всех пользователей при user_id=None) плюс общие shared_scopes.
+    Каждое событие журнала добавляет единицу, свертка переносит ее в data_version, не меняя сумму.
+    Версии только растут, поэтому сумма меняется при любой записи в любом из них.
+    """
+    versions = union_all(
+        select(DataVersion.version.label("version"))
+        .where(_version_conditions(DataVersion, scopes, user_id, shared_scopes)),
+        select(literal(1).label("version"))
+        .where(_version_conditions(DataVersionEvent, scopes, user_id, shared_scopes))
+    ).subquery()
+    result = await db.execute(select(func.coalesce(func.sum(versions.c.version), 0)))
+    return int(result.scalar())
+
+
+async def compact_versions(db: AsyncSession) -> int:
+    """
+    Переносит журнал data_version_event в data_version одним запросом (DELETE ... RETURNING внутри upsert).
+    Возвращает количество затронутых версий.
+    """
+    moved = (
+        delete(DataVersionEvent)
+        .returning(DataVersionEvent.scope, DataVersionEvent.user_id)
+        .cte("moved")
+    )
+    stmt = insert(DataVersion).from_select(
+        ["scope", "user_id", "version"],
+        select(moved.c.scope, moved.c.user_id, func.count()).group_by(moved.c.scope, moved.c.user_id)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DataVersion.scope, DataVersion.user_id],
+        set_={"version": DataVersion.version + stmt.excluded.version}
+    ).returning(DataVersion.scope)
+    result = await db.execute(stmt)
+    count = len(result.all())
+    await db.commit()
+    return count
+
+
+def make_etag(request: Request, version: int, user_id: int) -> str:
+    key = f"{request.url.path}?{request.url.query}|{user_id}|{version}"
+    return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def etag_guard(*scopes: str, shared_scopes: Sequence[str] = (), admin_scopes: Sequence[str] | None = None):
+    """
+    Зависимость для GET-списков: отвечает 304 по If-None-Match до выполнения запроса страницы,
+    иначе ставит ETag в ответ. Версия читается той же сессией get_read_db, что и сама страница.
+    Администратор видит данные всех пользователей, поэтому для него берется сумма версий
+    всех пользователей по admin_scopes.
+    """
+    async def dependency(
+            request: Request,
+            response: Response,
+            principal: Principal = Depends(get_principal),
+            db: AsyncSession = Depends(get_read_db)
+    ):
+        if principal.is_admin:
+            version = await read_version(db, admin_scopes or scopes, None, shared_scopes)
+        else:
+            version = await read_version(db, scopes, principal.id, shared_scopes)
+
+        etag = make_etag(request, version, principal.id)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return dependency
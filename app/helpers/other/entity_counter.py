@@ -0,0 +1,132 @@
+from typing import Type
+
+from sqlalchemy import select, func, delete, literal, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.budget_list.budget_list_alchemy import BudgetList
+from app.Models.budget_list.budget_list_archive_alchemy import BudgetListArchive
+from app.Models.entity_counter.entity_counter_alchemy import EntityCounter
+from app.Models.entity_counter.entity_counter_delta_alchemy import EntityCounterDelta
+from app.Models.wallet.wallet_model_alchemy import Wallet
+from app.database.base import Base
+from app.helpers.wallet.wallet_ledger import WALLET_LEDGER_MODE
+
+COUNTED_ENTITIES = {BudgetList.__tablename__, BudgetListArchive.__tablename__, Wallet.__tablename__}
+
+
+async def bump_counter(db: AsyncSession, model: Type[Base], user_id: int, delta: int, type_budget: str = ''):
+    """
+    Меняет счетчик записей пользователя. Вызывается в той же транзакции, что и вставка/удаление записи.
+
+    Upsert строки (user_id, entity, type_budget) держит ее блокировку до commit: записи одного пользователя
+    одного вида выполняются по очереди. В режиме WALLET_LEDGER_MODE вместо этого добавляется строка
+    в entity_counter_delta, которую переносит compact_counters, и записи друг друга не ждут.
+    """
+    if WALLET_LEDGER_MODE:
+        await db.execute(insert(EntityCounterDelta).values(
+            user_id=user_id,
+            entity=model.__tablename__,
+            type_budget=type_budget,
+            delta=delta
+        ))
+        return
+
+    stmt = insert(EntityCounter).values(
+        user_id=user_id,
+        entity=model.__tablename__,
+        type_budget=type_budget,
+        total=delta
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EntityCounter.user_id, EntityCounter.entity, EntityCounter.type_budget],
+        set_={"total": EntityCounter.total + stmt.excluded.total}
+    )
+    await db.execute(stmt)
+
+
+def _counter_conditions(counter, model: Type[Base], user_id: int | None, type_budget: str | None):
+    conditions = [counter.entity == model.__tablename__]
+    if user_id is not None:
+        conditions.append(counter.user_id == user_id)
+    if type_budget is not None:
+        conditions.append(counter.type_budget == type_budget)
+    return conditions
+
+
+async def read_counter(
+        db: AsyncSession,
+        model: Type[Base],
+        user_id: int | None = None,
+        type_budget: str | None = None
+) -> int:
+    """
+    Счетчик вместе с еще не свернутыми изменениями из entity_counter_delta.
+    """
+    totals = union_all(
+        select(EntityCounter.total.label("total"))
+        .where(*_counter_conditions(EntityCounter, model, user_id, type_budget)),
+        select(EntityCounterDelta.delta.label("total"))
+        .where(*_counter_conditions(EntityCounterDelta, model, user_id, type_budget))
+    ).subquery()
+    result = await db.execute(select(func.coalesce(func.sum(totals.c.total), 0)))
+    return int(result.scalar())
+
+
+async def compact_counters(db: AsyncSession) -> int:
+    """
+    Переносит entity_counter_delta в entity_counter одним запросом (DELETE ... RETURNING внутри upsert).
+    Возвращает количество обновленных счетчиков.
+    """
+    moved = (
+        delete(EntityCounterDelta)
+        .returning(EntityCounterDelta.user_id, EntityCounterDelta.entity,
+                   EntityCounterDelta.type_budget, EntityCounterDelta.delta)
+        .cte("moved")
+    )
+    stmt = insert(EntityCounter).from_select(
+        ["user_id", "entity", "type_budget", "total"],
+        select(moved.c.user_id, moved.c.entity, moved.c.type_budget, func.sum(moved.c.delta))
+        .group_by(moved.c.user_id, moved.c.entity, moved.c.type_budget)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EntityCounter.user_id, EntityCounter.entity, EntityCounter.type_budget],
+        set_={"total": EntityCounter.total + stmt.excluded.total}
+    ).returning(EntityCounter.user_id)
+    result = await db.execute(stmt)
+    count = len(result.all())
+    await db.commit()
+    return count
+
+
+async def rebuild_counters(db: AsyncSession):
+    """
+    Пересчитывает все счетчики по фактическим данным таблиц; несвернутые изменения при этом не нужны.
+    """
+    await db.execute(delete(EntityCounterDelta))
+    await db.execute(delete(EntityCounter))
+
+    for model in (BudgetList, BudgetListArchive):
+        await db.execute(
+            insert(EntityCounter).from_select(
+                ["user_id", "entity", "type_budget", "total"],
+                select(
+                    model.user_id,
+                    literal(model.__tablename__),
+                    model.type_budget,
+                    func.count()
+                ).group_by(model.user_id, model.type_budget)
+            )
+        )
+    await db.execute(
+        insert(EntityCounter).from_select(
+            ["user_id", "entity", "type_budget", "total"],
+            select(
+                Wallet.user_id,
+                literal(Wallet.__tablename__),
+                literal(''),
+                func.count()
+            ).group_by(Wallet.user_id)
+        )
+    )
+    await db.commit()
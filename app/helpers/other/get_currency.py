@@ -1,68 +1,109 @@
 import os
+from datetime import datetime, timedelta, timezone
 
 import httpx
 
 from dotenv import load_dotenv
-from fastapi import Depends
+from fastapi import Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.Models.currency.currency_alchemy import CurrencyAlchemy
 from app.Models.currency.currency_model import CurrencyApiData
-from app.database.database import get_db
+from app.Models.currency.currency_rate_alchemy import CurrencyRateAlchemy
+from app.database.database import get_db, AsyncSessionLocal
+from app.helpers.other.currency_catalog import currency_catalog
+from app.helpers.other.http_client import get_http_client
+from app.helpers.other.quote_cache import QuoteCache
 
 load_dotenv()
 CURRENCY_API_KEY = os.getenv("CURRENCY_API_KEY")
+CURRENCY_API_URL = os.getenv("CURRENCY_API_URL", "https://apilayer.net/api/live")
+# курс из currency_rate старше этого (по умолчанию три RATE_REFRESH_INTERVAL) считается устаревшим:
+# refresher мог остановиться или быть выключен, тогда курс берется из API
+RATE_MAX_AGE = float(os.getenv("RATE_MAX_AGE", "1800"))
 
+quote_cache = QuoteCache()
 
-async def get_currency(db: AsyncSession = Depends(get_db), type_id: int | None = None):
-    query = select(CurrencyAlchemy)
-    cur = await db.execute(query)
-    cur_res =  cur.scalars().all()
 
-    names = [currency.short_name for currency in cur_res]
-    name_result_str = ",".join(names)
+async def get_currency(db: AsyncSession = Depends(get_db), type_id: int | None = None,
+                       client: httpx.AsyncClient | None = None):
+    currencies = await currency_catalog.all(db)
+    name_result_str = ",".join(currency.short_name for currency in currencies)
 
+    type_name = await currency_short_name(db, type_id)
 
-    query_type=select(CurrencyAlchemy).where(CurrencyAlchemy.id == type_id)
-    cur_type = await db.execute(query_type)
-    cur_res_type = cur_type.scalar_one_or_none()
-
-    type_name = cur_res_type.short_name
-
-    url = f'https://apilayer.net/api/live?access_key={CURRENCY_API_KEY}&currencies={name_result_str}&source={type_name}&format=1'
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        response.raise_for_status()
-        return response.json()
+    url = f'{CURRENCY_API_URL}?access_key={CURRENCY_API_KEY}&currencies={name_result_str}&source={type_name}&format=1'
+    client = client or get_http_client()
+    response = await client.get(url)
+    response.raise_for_status()
+    return response.json()
 
 
 async def get_currency_one(db: AsyncSession = Depends(get_db), type_id: int | None = None,
                            wallet_type_id: int | None = None) -> CurrencyApiData:
-    query = select(CurrencyAlchemy).where(CurrencyAlchemy.id == wallet_type_id)
-    cur = await db.execute(query)
-    cur_res = cur.scalar_one_or_none()
+    names = await currency_short_name(db, wallet_type_id)
+    type_name = await currency_short_name(db, type_id)
+
+    return await get_rate(type_name, names)
+
+
+async def currency_short_name(db: AsyncSession, currency_id: int | None) -> str:
+    short_name = await currency_catalog.short_name(db, currency_id)
+    if short_name is None:
+        raise HTTPException(status_code=400, detail="Данной валюты не существует")
+    return short_name
+
+
+async def get_rate(type_name: str, names: str) -> CurrencyApiData:
+    return await quote_cache.get((type_name, names), lambda: fetch_rate(type_name, names))
+
+
+async def fetch_rate(type_name: str, names: str) -> CurrencyApiData:
+    """
+    Берет курс из таблицы currency_rate, которую наполняет фоновый refresher.
+    В API ходит, если пары в таблице еще нет или она старше RATE_MAX_AGE секунд.
+    """
+    async with AsyncSessionLocal() as db:
+        query = select(CurrencyRateAlchemy).where(
+            CurrencyRateAlchemy.source == type_name,
+            CurrencyRateAlchemy.target == names
+        )
+        result = await db.execute(query)
+        rate = result.scalar_one_or_none()
+
+    if rate is not None and datetime.now(timezone.utc) - rate.updated_at <= timedelta(seconds=RATE_MAX_AGE):
+        return rate_to_api_data(rate)
+
+    return await fetch_currency_quote(type_name, names)
+
 
-    names = cur_res.short_name
-    query_type = select(CurrencyAlchemy).where(CurrencyAlchemy.id == type_id)
-    cur_type = await db.execute(query_type)
-    cur_res_type = cur_type.scalar_one_or_none()
+def rate_to_api_data(rate: CurrencyRateAlchemy) -> CurrencyApiData:
+    currency_key = f'{rate.source}{rate.target}'
+    return CurrencyApiData(
+        success=True,
+        terms='',
+        privacy='',
+        timestamp=int(rate.updated_at.timestamp()),
+        source=rate.source,
+        quotes={currency_key: rate.value},
+        fields=currency_key
+    )
 
-    type_name = cur_res_type.short_name
 
-    url = f'https://apilayer.net/api/live?access_key={CURRENCY_API_KEY}&currencies={names}&source={type_name}&format=1'
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        response.raise_for_status()
-        data = response.json()
+async def fetch_currency_quote(type_name: str, names: str, client: httpx.AsyncClient | None = None) -> CurrencyApiData:
+    url = f'{CURRENCY_API_URL}?access_key={CURRENCY_API_KEY}&currencies={names}&source={type_name}&format=1'
+    client = client or get_http_client()
+    response = await client.get(url)
+    response.raise_for_status()
+    data = response.json()
 
-        currency_key = f'{type_name}{names}'
-        data['fields'] = currency_key
+    currency_key = f'{type_name}{names}'
+    data['fields'] = currency_key
 
-        if not data.get('quotes') or data['quotes'] == []:
-            data['quotes'] = {currency_key: 1.0}
+    if not data.get('quotes') or data['quotes'] == []:
+        data['quotes'] = {currency_key: 1.0}
 
-        print(data)
-        currency_data = CurrencyApiData(**data)
+    print(data)
+    currency_data = CurrencyApiData(**data)
 
-        return currency_data
\ No newline at end of file
+    return currency_data
\ No newline at end of file
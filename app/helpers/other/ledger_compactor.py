@@ -0,0 +1,36 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.database import AsyncSessionLocal
+from app.helpers.budget_list.ledger_rollup import compact_rollups
+from app.helpers.other.data_version import compact_versions
+from app.helpers.other.entity_counter import compact_counters
+from app.helpers.wallet.wallet_ledger import WALLET_LEDGER_COMPACT_INTERVAL, compact_wallet_ledger
+
+
+async def compact_ledgers(db: AsyncSession) -> int:
+    """
+    Сворачивает журналы, в которые записи только добавляют строки: дельты кошельков (wallet_ledger),
+    события версий данных (data_version_event), изменения счетчиков (entity_counter_delta)
+    и агрегатов (ledger_rollup_delta).
+    Каждая свертка - отдельная транзакция.
+    Возвращает количество обновленных строк агрегатов.
+    """
+    compacted = await compact_wallet_ledger(db)
+    compacted += await compact_versions(db)
+    compacted += await compact_counters(db)
+    compacted += await compact_rollups(db)
+    return compacted
+
+
+async def run_ledger_compactor(interval: float = WALLET_LEDGER_COMPACT_INTERVAL):
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await compact_ledgers(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Ошибка свертки журналов: {e}")
+        await asyncio.sleep(interval)
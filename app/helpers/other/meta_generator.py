@@ -7,17 +7,25 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.Models.other.meta_data import PaginationMeta
 from app.database.base import Base
 from app.database.database import get_db
+from app.helpers.other.entity_counter import COUNTED_ENTITIES, read_counter
 
 
 async def meta_generator(
     page: int,
     per_page: int,
     model: Type[Base],
-db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    user_id: int | None = None,
+    type_budget: str | None = None,
+    total: int | None = None
 ):
-    count_query = select(func.count()).select_from(model)
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    # total передается, когда список считает итог сам (фильтры, архив)
+    if total is None and model.__tablename__ in COUNTED_ENTITIES:
+        total = await read_counter(db, model, user_id, type_budget)
+    elif total is None:
+        count_query = select(func.count()).select_from(model)
+        total_result = await db.execute(count_query)
+        total = total_result.scalar()
     total_pages = (total + per_page - 1) // per_page
 
     results = PaginationMeta(
@@ -29,4 +37,4 @@ db: AsyncSession = Depends(get_db)
             has_prev=page > 1
         )
 
-    return results
\ No newline at end of file
+    return results
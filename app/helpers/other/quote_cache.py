@@ -0,0 +1,84 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+CURRENCY_CACHE_TTL = float(os.getenv("CURRENCY_CACHE_TTL", "300"))
+CURRENCY_CACHE_STALE_TTL = float(os.getenv("CURRENCY_CACHE_STALE_TTL", "3600"))
+
+
+class QuoteCache:
+    """
+    Кэш курсов валют по ключу (source, target).
+
+    Свежие значения (моложе ttl) отдаются сразу. Устаревшие, но не старше ttl + stale_ttl,
+    тоже отдаются сразу, а обновление запускается в фоне. Параллельные запросы одной пары
+    ждут один общий запрос к API.
+    """
+
+    def __init__(self, ttl: float = CURRENCY_CACHE_TTL, stale_ttl: float = CURRENCY_CACHE_STALE_TTL):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def get(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._load(key, fetch)
+                return value
+
+        self.misses += 1
+        return await asyncio.shield(self._load(key, fetch))
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic(), value)
+
+    def invalidate(self, key: Hashable | None = None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "fetches": self.fetches,
+            "size": len(self._entries),
+            "inflight": len(self._inflight),
+        }
+
+    def _load(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, fetch))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return task
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        self.fetches += 1
+        try:
+            value = await fetch()
+            self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
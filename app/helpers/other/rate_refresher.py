@@ -0,0 +1,77 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+
+import httpx
+from dotenv import load_dotenv
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.currency.currency_rate_alchemy import CurrencyRateAlchemy
+from app.database.database import AsyncSessionLocal
+from app.helpers.other.currency_catalog import currency_catalog
+from app.helpers.other.get_currency import CURRENCY_API_KEY, CURRENCY_API_URL, quote_cache, rate_to_api_data
+from app.helpers.other.http_client import get_http_client
+
+
+load_dotenv()
+
+RATE_REFRESH_INTERVAL = float(os.getenv("RATE_REFRESH_INTERVAL", "600"))
+
+
+async def refresh_rates(db: AsyncSession, client: httpx.AsyncClient | None = None) -> int:
+    """
+    Загружает матрицу курсов для всех валют из таблицы currency и сохраняет ее в currency_rate.
+    Возвращает количество сохраненных пар.
+    """
+    names = sorted({currency.short_name for currency in await currency_catalog.all(db) if currency.short_name})
+    if not names:
+        return 0
+
+    currencies = ",".join(names)
+    updated_at = datetime.now(timezone.utc)
+    rows = []
+
+    client = client or get_http_client()
+    for source in names:
+        url = f'{CURRENCY_API_URL}?access_key={CURRENCY_API_KEY}&currencies={currencies}&source={source}&format=1'
+        response = await client.get(url)
+        response.raise_for_status()
+        quotes = response.json().get('quotes') or {}
+
+        for target in names:
+            value = quotes.get(f'{source}{target}')
+            if value is None and source == target:
+                value = 1.0
+            if value is None:
+                continue
+            rows.append({"source": source, "target": target, "value": value, "updated_at": updated_at})
+
+    if not rows:
+        return 0
+
+    stmt = insert(CurrencyRateAlchemy).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CurrencyRateAlchemy.source, CurrencyRateAlchemy.target],
+        set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at}
+    )
+    await db.execute(stmt)
+    await db.commit()
+
+    for row in rows:
+        quote_cache.set((row["source"], row["target"]), rate_to_api_data(CurrencyRateAlchemy(**row)))
+
+    return len(rows)
+
+
+async def run_rate_refresher(interval: float = RATE_REFRESH_INTERVAL, client: httpx.AsyncClient | None = None):
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                count = await refresh_rates(db, client)
+            print(f"Курсы валют обновлены: {count}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Ошибка обновления курсов валют: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,106 @@
+import os
+import time
+from typing import Dict, Iterable, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session, with_polymorphic
+
+from app.Models.base_model_type.base_model_type import BaseType
+from app.Models.budget_list.budget_list import BudgetTypeResponse
+from app.Models.expense_type.expense_type import ExpenseType
+from app.Models.income_types.income_types import IncomeType
+from app.database.replica import note_write
+from app.helpers.other.data_version import TYPES_SCOPE, version_bump_statement
+
+
+load_dotenv()
+
+TYPE_CATALOG_TTL = float(os.getenv("TYPE_CATALOG_TTL", "600"))
+
+CatalogEntry = Tuple[str, BudgetTypeResponse]
+
+
+class TypeCatalog:
+    """
+    Справочник типов доходов и затрат в памяти процесса: id -> (income/expense, BudgetTypeResponse).
+
+    Прогревается целиком при старте, дальше догружает только отсутствующие или устаревшие (старше ttl) id
+    одним запросом. Записи сбрасываются событиями ORM при изменении типов в этом процессе,
+    ttl нужен для изменений, сделанных другими процессами.
+    """
+
+    def __init__(self, ttl: float = TYPE_CATALOG_TTL):
+        self.ttl = ttl
+        self._entries: Dict[int, Tuple[float, CatalogEntry]] = {}
+
+    async def warm(self, db: AsyncSession) -> int:
+        result = await db.execute(select(with_polymorphic(BaseType, [IncomeType, ExpenseType])))
+        self._entries.clear()
+        for base_type in result.scalars().all():
+            self._store(base_type)
+        return len(self._entries)
+
+    async def get_many(self, db: AsyncSession, ids: Iterable[int]) -> Dict[int, CatalogEntry]:
+        now = time.monotonic()
+        ids = set(ids)
+        missing = {type_id for type_id in ids
+                   if type_id not in self._entries or now - self._entries[type_id][0] >= self.ttl}
+
+        if missing:
+            polymorphic = with_polymorphic(BaseType, [IncomeType, ExpenseType])
+            result = await db.execute(select(polymorphic).where(polymorphic.id.in_(missing)))
+            for base_type in result.scalars().all():
+                self._store(base_type)
+
+        return {type_id: self._entries[type_id][1] for type_id in ids if type_id in self._entries}
+
+    async def get(self, db: AsyncSession, type_budget: str, type_id: int) -> BudgetTypeResponse | None:
+        entry = (await self.get_many(db, [type_id])).get(type_id)
+        if entry is None or entry[0] != type_budget:
+            return None
+        return entry[1]
+
+    def invalidate(self, type_id: int | None = None):
+        if type_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(type_id, None)
+
+    def _store(self, base_type: BaseType):
+        if not isinstance(base_type, (IncomeType, ExpenseType)):
+            return
+        response = BudgetTypeResponse(
+            id=base_type.id,
+            name=base_type.name,
+            description=base_type.description or '',
+            content=base_type.content
+        )
+        self._entries[base_type.id] = (time.monotonic(), (base_type.type, response))
+
+
+type_catalog = TypeCatalog()
+
+
+@event.listens_for(BaseType, "after_insert", propagate=True)
+@event.listens_for(BaseType, "after_update", propagate=True)
+@event.listens_for(BaseType, "after_delete", propagate=True)
+def invalidate_type(mapper, connection, target):
+    """
+    Сбрасывает тип сразу при flush и еще раз после commit: между ними параллельный запрос
+    мог успеть загрузить в справочник старую версию.
+    В той же транзакции увеличивает общую версию TYPES_SCOPE - ETag списков, в которые входят типы.
+    """
+    type_catalog.invalidate(target.id)
+    connection.execute(version_bump_statement(TYPES_SCOPE))
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_type_ids", set()).add(target.id)
+        note_write(session, 0)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_types(session):
+    for type_id in session.info.pop("changed_type_ids", ()):
+        type_catalog.invalidate(type_id)
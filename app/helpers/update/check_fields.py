@@ -1,42 +1,73 @@
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.inspection import inspect
-from sqlalchemy import select
+from sqlalchemy import Column, exists, literal, select, union_all
 from fastapi import HTTPException
 
+from app.Models.currency.currency_alchemy import CurrencyAlchemy
 from app.database.base import Base
+from app.helpers.other.currency_catalog import currency_catalog
 
+ForeignKeyTarget = Tuple[str, type, Column]
 
-async def validate_foreign_keys(db: AsyncSession, model_instance, update_data: dict):
+
+@lru_cache(maxsize=None)
+def foreign_key_map() -> Dict[type, List[ForeignKeyTarget]]:
     """
-    Проверяет, что все внешние ключи в update_data существуют в связанных таблицах.
+    Для каждой модели: (поле, модель-цель, колонка-цель) по всем ее внешним ключам.
+    Строится один раз по всему реестру мапперов, поэтому наследники вроде IncomeType/ExpenseType тоже учтены.
     """
-    errors = []
-    mapper = inspect(model_instance.__class__)
-
-    for column in mapper.columns:
-        if column.foreign_keys and column.key in update_data:
-            field_value = update_data[column.key]
+    mappers = list(Base.registry.mappers)
+    models_by_table = {mapper.local_table: mapper.class_ for mapper in mappers}
 
-            if field_value is None:
+    result = {}
+    for mapper in mappers:
+        targets = []
+        for prop in mapper.column_attrs:
+            column = prop.columns[0]
+            if not column.foreign_keys:
                 continue
+            target_column = next(iter(column.foreign_keys)).column
+            target_model = models_by_table.get(target_column.table)
+            if target_model is not None:
+                targets.append((prop.key, target_model, target_column))
+        result[mapper.class_] = targets
+    return result
 
-            fk = next(iter(column.foreign_keys))
-            target_table = fk.column.table
 
-            target_model = None
-            for model in Base.__subclasses__():
-                if hasattr(model, '__tablename__') and model.__tablename__ == target_table.name:
-                    target_model = model
-                    break
+async def validate_foreign_keys(db: AsyncSession, model_instance, update_data: dict):
+    """
+    Проверяет, что все внешние ключи в update_data существуют в связанных таблицах.
+    Валюты проверяются по currency_catalog, остальные ключи - одним запросом UNION ALL из EXISTS.
+    """
+    errors = []
+    checks = []
+
+    for key, target_model, target_column in foreign_key_map().get(type(model_instance), []):
+        field_value = update_data.get(key)
+        if field_value is None:
+            continue
 
-            if target_model:
-                query = select(target_model).where(target_model.id == field_value)
-                result = await db.execute(query)
-                exists = result.scalar_one_or_none()
+        if target_model is CurrencyAlchemy:
+            if await currency_catalog.get(db, field_value) is None:
+                errors.append((key, field_value))
+        else:
+            checks.append((key, field_value, target_column))
 
-                if not exists:
-                    field_name = column.key.replace('_id', '').replace('_', ' ').capitalize()
-                    errors.append(f"{field_name} с id {field_value} не существует")
+    if checks:
+        query = union_all(*(
+            select(literal(index).label("index"), exists().where(target_column == field_value).label("found"))
+            for index, (_, field_value, target_column) in enumerate(checks)
+        ))
+        result = await db.execute(query)
+        for index, found in result.all():
+            if not found:
+                key, field_value, _ = checks[index]
+                errors.append((key, field_value))
 
     if errors:
-        raise HTTPException(status_code=400, detail="; ".join(errors))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail="; ".join(
+            f"{key.replace('_id', '').replace('_', ' ').capitalize()} с id {field_value} не существует"
+            for key, field_value in errors
+        ))
@@ -0,0 +1,297 @@
+import asyncio
+import os
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import select, func, delete, update, case, cast, literal, literal_column, or_, Date, true, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.budget_list.budget_list_alchemy import BudgetList
+from app.Models.budget_list.budget_list_archive_alchemy import BudgetListArchive
+from app.Models.wallet.wallet_balance_alchemy import WalletBalanceDay
+from app.Models.wallet.wallet_balance_flow_alchemy import WalletBalanceFlow
+from app.Models.wallet.wallet_model_alchemy import Wallet
+from app.database.database import AsyncSessionLocal
+from app.helpers.budget_list.ledger_rollup import period_start
+from app.helpers.wallet.wallet_ledger import WALLET_LEDGER_MODE, pending_delta
+
+
+load_dotenv()
+
+BALANCE_INDEX_REFRESH_INTERVAL = float(os.getenv("BALANCE_INDEX_REFRESH_INTERVAL", "5"))
+
+# Отдельное пространство advisory lock: пересчет cumulative одного кошелька идет в одном процессе.
+# Записи этот lock не берут и строк wallet_balance_day не трогают
+BALANCE_INDEX_LOCK_NAMESPACE = 1002
+
+
+def _flow_column(model=BudgetList):
+    """
+    Движение по кошельку в его валюте: доход со знаком плюс, затрата со знаком минус.
+    """
+    direction = case((model.type_budget == 'income', 1), else_=-1)
+    return direction * model.value * func.coalesce(model.currency_value, 1)
+
+
+def _day_column(model=BudgetList):
+    # GROUP BY должен совпадать с SELECT дословно, поэтому константы без bind-параметров
+    return cast(func.date_trunc(literal_column("'day'"), func.timezone(literal_column("'UTC'"), model.date)), Date)
+
+
+def _entry_flow(entry: BudgetList) -> float:
+    direction = 1 if entry.type_budget == 'income' else -1
+    return direction * entry.value * (entry.currency_value or 1)
+
+
+def _cumulative_before(wallet_id: int, day: date):
+    return func.coalesce(
+        select(WalletBalanceDay.cumulative)
+        .where(WalletBalanceDay.wallet_id == wallet_id, WalletBalanceDay.day < day)
+        .order_by(WalletBalanceDay.day.desc())
+        .limit(1)
+        .scalar_subquery(),
+        0
+    )
+
+
+async def _apply_flows(db: AsyncSession, flows: Dict[Tuple[int, date], float]):
+    """
+    Добавляет дневные движения (wallet_id, day) -> net строками в wallet_balance_flow.
+    Только INSERT новых строк: ни одна общая строка не блокируется до commit, поэтому записи
+    в один кошелек за один день не ждут друг друга. В wallet_balance_day их переносит refresh_balance_index.
+    """
+    if not flows:
+        return
+    await db.execute(insert(WalletBalanceFlow).values([
+        {"wallet_id": wallet_id, "day": day, "net": net}
+        for (wallet_id, day), net in flows.items()
+    ]))
+
+
+async def apply_balance(db: AsyncSession, entry: BudgetList, sign: int):
+    """
+    Добавляет (sign=1) или вычитает (sign=-1) запись из индекса балансов ее кошелька.
+    """
+    if entry.wallet_id is None or entry.date is None:
+        return
+    await _apply_flows(db, {(entry.wallet_id, period_start(entry.date, "day")): sign * _entry_flow(entry)})
+
+
+async def apply_balances_from_rows(db: AsyncSession, where, sign: int = 1):
+    """
+    Пакетный вариант apply_balance для строк budget_list, подходящих под where: один INSERT ... SELECT.
+    """
+    day_column = _day_column()
+    await db.execute(insert(WalletBalanceFlow).from_select(
+        ["wallet_id", "day", "net"],
+        select(BudgetList.wallet_id, day_column, func.sum(_flow_column()) * sign)
+        .where(BudgetList.wallet_id.is_not(None), BudgetList.date.is_not(None), where)
+        .group_by(BudgetList.wallet_id, day_column)
+    ))
+
+
+async def fold_balance_flows(db: AsyncSession):
+    """
+    Переносит журнал wallet_balance_flow в wallet_balance_day одним запросом (DELETE ... RETURNING
+    внутри upsert) и помечает затронутые дни dirty. Удаление и перенос атомарны: читатель видит
+    каждое движение ровно один раз - либо в журнале, либо в индексе.
+    """
+    moved = (
+        delete(WalletBalanceFlow)
+        .returning(WalletBalanceFlow.wallet_id, WalletBalanceFlow.day, WalletBalanceFlow.net)
+        .cte("moved")
+    )
+    stmt = insert(WalletBalanceDay).from_select(
+        ["wallet_id", "day", "net", "cumulative", "dirty"],
+        select(moved.c.wallet_id, moved.c.day, func.sum(moved.c.net), literal(0.0), true())
+        .group_by(moved.c.wallet_id, moved.c.day)
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[WalletBalanceDay.wallet_id, WalletBalanceDay.day],
+        set_={"net": WalletBalanceDay.net + stmt.excluded.net, "dirty": True}
+    ))
+
+
+async def refresh_wallet_cumulative(db: AsyncSession, wallet_id: int):
+    """
+    Пересчитывает cumulative кошелька начиная с первого dirty-дня и снимает пометки.
+    Строка обновляется, только если ее net не изменился с момента снимка: день, в который параллельный
+    refresher успел перенести новые движения, остается dirty и попадет в следующий проход.
+    """
+    await db.execute(select(func.pg_advisory_xact_lock(BALANCE_INDEX_LOCK_NAMESPACE, wallet_id)))
+    result = await db.execute(
+        select(func.min(WalletBalanceDay.day))
+        .where(WalletBalanceDay.wallet_id == wallet_id, WalletBalanceDay.dirty.is_(True))
+    )
+    first_day = result.scalar()
+    if first_day is None:
+        return
+
+    running = (
+        select(
+            WalletBalanceDay.day,
+            WalletBalanceDay.net,
+            (_cumulative_before(wallet_id, first_day) + func.sum(WalletBalanceDay.net).over(
+                order_by=WalletBalanceDay.day
+            )).label("cumulative")
+        )
+        .where(WalletBalanceDay.wallet_id == wallet_id, WalletBalanceDay.day >= first_day)
+        .subquery()
+    )
+    await db.execute(
+        update(WalletBalanceDay)
+        .where(
+            WalletBalanceDay.wallet_id == wallet_id,
+            WalletBalanceDay.day == running.c.day,
+            WalletBalanceDay.net == running.c.net
+        )
+        .values(cumulative=running.c.cumulative, dirty=False),
+        execution_options={"synchronize_session": False}
+    )
+
+
+async def refresh_balance_index(db: AsyncSession) -> int:
+    """
+    Переносит журнал движений в индекс, затем пересчитывает cumulative всех кошельков
+    с dirty-днями, по транзакции на кошелек.
+    """
+    await fold_balance_flows(db)
+    await db.commit()
+
+    result = await db.execute(
+        select(WalletBalanceDay.wallet_id).where(WalletBalanceDay.dirty.is_(True)).distinct()
+    )
+    wallet_ids = sorted(result.scalars().all())
+    await db.commit()
+
+    for wallet_id in wallet_ids:
+        await refresh_wallet_cumulative(db, wallet_id)
+        await db.commit()
+    return len(wallet_ids)
+
+
+async def run_balance_index_refresher(interval: float = BALANCE_INDEX_REFRESH_INTERVAL):
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await refresh_balance_index(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Ошибка пересчета индекса балансов: {e}")
+        await asyncio.sleep(interval)
+
+
+async def rebuild_balance_index(db: AsyncSession):
+    """
+    Строит индекс заново по всем записям budget_list и архива одним INSERT ... SELECT с оконной суммой:
+    архивирование балансы не меняет. Журнал движений очищается: все его строки уже учтены в записях.
+    """
+    await db.execute(delete(WalletBalanceFlow))
+    await db.execute(delete(WalletBalanceDay))
+
+    flows = union_all(*(
+        select(
+            model.wallet_id.label("wallet_id"),
+            _day_column(model).label("day"),
+            _flow_column(model).label("flow")
+        ).where(model.wallet_id.is_not(None), model.date.is_not(None))
+        for model in (BudgetList, BudgetListArchive)
+    )).subquery()
+    daily = (
+        select(flows.c.wallet_id, flows.c.day, func.sum(flows.c.flow).label("net"))
+        .group_by(flows.c.wallet_id, flows.c.day)
+        .subquery()
+    )
+    await db.execute(
+        insert(WalletBalanceDay).from_select(
+            ["wallet_id", "day", "net", "cumulative"],
+            select(
+                daily.c.wallet_id,
+                daily.c.day,
+                daily.c.net,
+                func.sum(daily.c.net).over(partition_by=daily.c.wallet_id, order_by=daily.c.day)
+            )
+        )
+    )
+    await db.commit()
+
+
+def _current_balance(wallet_id: int):
+    column = Wallet.value + pending_delta(Wallet.id) if WALLET_LEDGER_MODE else Wallet.value
+    return select(column).where(Wallet.id == wallet_id).scalar_subquery()
+
+
+def _prefix_sum(wallet_id: int, day: date | None = None):
+    """
+    Сумма net индекса кошелька по день day включительно (None - по всем дням).
+    cumulative берется у последнего дня перед первым dirty-днем - до него он точный,
+    оставшиеся дни досчитываются по net. После пересчета это один поиск по первичному ключу.
+    """
+    first_dirty = (
+        select(func.min(WalletBalanceDay.day))
+        .where(WalletBalanceDay.wallet_id == wallet_id, WalletBalanceDay.dirty.is_(True))
+        .scalar_subquery()
+    )
+    anchor = select(WalletBalanceDay.cumulative).where(
+        WalletBalanceDay.wallet_id == wallet_id,
+        or_(first_dirty.is_(None), WalletBalanceDay.day < first_dirty)
+    )
+    # без dirty-дней условие day >= NULL не выбирает ничего
+    tail = select(func.sum(WalletBalanceDay.net)).where(
+        WalletBalanceDay.wallet_id == wallet_id,
+        WalletBalanceDay.day >= first_dirty
+    )
+    if day is not None:
+        anchor = anchor.where(WalletBalanceDay.day <= day)
+        tail = tail.where(WalletBalanceDay.day <= day)
+    anchor = anchor.order_by(WalletBalanceDay.day.desc()).limit(1).scalar_subquery()
+    return func.coalesce(anchor, 0) + func.coalesce(tail.scalar_subquery(), 0)
+
+
+def _pending_after(wallet_id: int, day: date):
+    """
+    Сумма еще не перенесенных в индекс движений кошелька после дня day.
+    """
+    return func.coalesce(
+        select(func.sum(WalletBalanceFlow.net))
+        .where(WalletBalanceFlow.wallet_id == wallet_id, WalletBalanceFlow.day > day)
+        .scalar_subquery(),
+        0
+    )
+
+
+def _balance_as_of_column(wallet_id: int, day: date):
+    return _current_balance(wallet_id) - (_prefix_sum(wallet_id) - _prefix_sum(wallet_id, day)) \
+        - _pending_after(wallet_id, day)
+
+
+async def balance_as_of(db: AsyncSession, wallet_id: int, day: date) -> float:
+    """
+    Баланс на конец дня day: текущий баланс минус движения после этого дня - из индекса
+    по первичному ключу (wallet_id, day) и из еще не перенесенного журнала.
+    Все части читаются одним запросом, то есть из одного снимка: перенос журнала refresher'ом
+    между ними не даст учесть движение дважды или потерять его.
+    """
+    result = await db.execute(select(_balance_as_of_column(wallet_id, day)))
+    return result.scalar()
+
+
+async def balance_series(db: AsyncSession, wallet_id: int, date_from: date, date_to: date) -> List[dict]:
+    """
+    Баланс на конец каждого дня с движениями в диапазоне [date_from, date_to], одним запросом.
+    """
+    daily = union_all(*(
+        select(model.day.label("day"), model.net.label("net"))
+        .where(model.wallet_id == wallet_id, model.day >= date_from, model.day <= date_to)
+        for model in (WalletBalanceDay, WalletBalanceFlow)
+    )).subquery()
+    grouped = select(daily.c.day, func.sum(daily.c.net).label("net")).group_by(daily.c.day).subquery()
+    opening = _balance_as_of_column(wallet_id, date_from - timedelta(days=1))
+    result = await db.execute(
+        select(grouped.c.day, grouped.c.net, opening + func.sum(grouped.c.net).over(order_by=grouped.c.day))
+        .order_by(grouped.c.day)
+    )
+    return [{"date": day, "net": net, "balance": balance} for day, net, balance in result.all()]
@@ -0,0 +1,34 @@
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.wallet.wallet_model_alchemy import Wallet
+from app.helpers.other.data_version import WALLET_SCOPE, bump_version
+from app.helpers.wallet.wallet_ledger import WALLET_LEDGER_MODE, append_wallet_delta
+
+
+async def change_wallet_value(
+        db: AsyncSession,
+        wallet_id: int,
+        user_id: int,
+        delta: float,
+        check_funds: bool = False
+) -> float | None:
+    """
+    Атомарно меняет баланс кошелька одним UPDATE ... RETURNING, без предварительного SELECT FOR UPDATE.
+    Возвращает новый баланс или None, если кошелек не найден или (при check_funds) не хватает средств.
+    При WALLET_LEDGER_MODE строка wallet не меняется, а изменение пишется в журнал (append_wallet_delta).
+    """
+    if WALLET_LEDGER_MODE:
+        value = await append_wallet_delta(db, wallet_id, user_id, delta, check_funds)
+    else:
+        query = update(Wallet).where(Wallet.id == wallet_id, Wallet.user_id == user_id)
+        if check_funds and delta < 0:
+            query = query.where(Wallet.value >= -delta)
+
+        query = query.values(value=Wallet.value + delta).returning(Wallet.value)
+        result = await db.execute(query, execution_options={"synchronize_session": False})
+        value = result.scalar_one_or_none()
+
+    if value is not None:
+        await bump_version(db, WALLET_SCOPE, user_id)
+    return value
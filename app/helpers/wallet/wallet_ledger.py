@@ -0,0 +1,138 @@
+import os
+from typing import Dict, Iterable, Sequence, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import select, func, delete, update, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.Models.wallet.wallet_ledger_alchemy import WalletLedger
+from app.Models.wallet.wallet_model_alchemy import Wallet
+
+
+load_dotenv()
+
+WALLET_LEDGER_MODE = os.getenv("WALLET_LEDGER_MODE", "false").lower() in ("1", "true", "yes")
+WALLET_LEDGER_COMPACT_INTERVAL = float(os.getenv("WALLET_LEDGER_COMPACT_INTERVAL", "5"))
+
+# Первый ключ двухключевого advisory lock, чтобы id кошельков не пересекались с другими блокировками
+WALLET_LOCK_NAMESPACE = 1001
+
+
+def pending_delta(wallet_id_column):
+    return func.coalesce(
+        select(func.sum(WalletLedger.delta))
+        .where(WalletLedger.wallet_id == wallet_id_column)
+        .scalar_subquery(),
+        0
+    )
+
+
+async def lock_wallet(db: AsyncSession, wallet_id: int):
+    """
+    Блокировка списаний с кошелька до конца транзакции. Строку wallet не трогает,
+    поэтому пополнения и компактор продолжают работать параллельно.
+    """
+    await db.execute(select(func.pg_advisory_xact_lock(WALLET_LOCK_NAMESPACE, wallet_id)))
+
+
+async def lock_wallets(db: AsyncSession, wallet_ids: Iterable[int]) -> Dict[int, Tuple[int, float]]:
+    """
+    Блокирует кошельки в порядке id и возвращает {id: (user_id, баланс)}.
+    В режиме журнала берет advisory lock, иначе SELECT ... FOR UPDATE по строкам wallet.
+    """
+    wallet_ids = sorted(set(wallet_ids))
+    if not wallet_ids:
+        return {}
+
+    query = select(Wallet.id, Wallet.user_id, Wallet.value).where(Wallet.id.in_(wallet_ids)).order_by(Wallet.id)
+    if WALLET_LEDGER_MODE:
+        for wallet_id in wallet_ids:
+            await lock_wallet(db, wallet_id)
+        query = query.with_only_columns(Wallet.id, Wallet.user_id, Wallet.value + pending_delta(Wallet.id))
+    else:
+        query = query.with_for_update()
+
+    result = await db.execute(query)
+    return {wallet_id: (user_id, value) for wallet_id, user_id, value in result.all()}
+
+
+async def append_wallet_delta(
+        db: AsyncSession,
+        wallet_id: int,
+        user_id: int,
+        delta: float,
+        check_funds: bool = False
+) -> float | None:
+    """
+    Режим журнала: вместо UPDATE wallet добавляет строку в wallet_ledger.
+    Списания с проверкой средств сериализуются advisory lock на кошелек; пополнения не блокируют ничего.
+    """
+    if check_funds and delta < 0:
+        await lock_wallet(db, wallet_id)
+
+    result = await db.execute(
+        select(Wallet.value + pending_delta(Wallet.id)).where(Wallet.id == wallet_id, Wallet.user_id == user_id)
+    )
+    balance = result.scalar_one_or_none()
+    if balance is None or (check_funds and delta < 0 and balance < -delta):
+        return None
+
+    await db.execute(insert(WalletLedger).values(wallet_id=wallet_id, delta=delta))
+    return balance + delta
+
+
+async def ledger_base_value(db: AsyncSession, wallet_id: int, balance: float) -> float:
+    """
+    Значение для Wallet.value, при котором баланс с учетом несвернутых дельт станет равен balance.
+    """
+    if not WALLET_LEDGER_MODE:
+        return balance
+
+    result = await db.execute(select(pending_delta(wallet_id)))
+    return balance - result.scalar()
+
+
+async def hydrate_balances(db: AsyncSession, wallets: Sequence[Wallet]):
+    """
+    Добавляет к Wallet.value еще не свернутые дельты журнала. Значение ставится как загруженное из базы,
+    поэтому при commit оно не запишется обратно.
+    """
+    if not WALLET_LEDGER_MODE or not wallets:
+        return
+
+    result = await db.execute(
+        select(WalletLedger.wallet_id, func.sum(WalletLedger.delta))
+        .where(WalletLedger.wallet_id.in_({wallet.id for wallet in wallets}))
+        .group_by(WalletLedger.wallet_id)
+    )
+    pending = dict(result.all())
+    for wallet in wallets:
+        set_committed_value(wallet, "value", wallet.value + pending.get(wallet.id, 0))
+
+
+async def compact_wallet_ledger(db: AsyncSession) -> int:
+    """
+    Переносит все видимые дельты журнала в Wallet.value одним запросом: удаление строк журнала
+    и обновление балансов атомарны, поэтому сумма "снимок + дельты" не меняется ни для одного читателя.
+    """
+    moved = (
+        delete(WalletLedger)
+        .returning(WalletLedger.wallet_id, WalletLedger.delta)
+        .cte("moved")
+    )
+    sums = (
+        select(moved.c.wallet_id, func.sum(moved.c.delta).label("delta"))
+        .group_by(moved.c.wallet_id)
+        .cte("sums")
+    )
+    stmt = (
+        update(Wallet)
+        .where(Wallet.id == sums.c.wallet_id)
+        .values(value=Wallet.value + sums.c.delta)
+        .returning(Wallet.id)
+    )
+    result = await db.execute(stmt, execution_options={"synchronize_session": False})
+    count = len(result.all())
+    await db.commit()
+    return count
@@ -0,0 +1,34 @@
+from typing import List, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.Models.wallet.wallet_model import WalletResponse
+from app.Models.wallet.wallet_model_alchemy import Wallet
+from app.helpers.other.currency_catalog import currency_catalog
+from app.helpers.wallet.wallet_ledger import hydrate_balances
+
+
+async def wallet_responses(db: AsyncSession, wallets: Sequence[Wallet]) -> List[WalletResponse]:
+    """
+    Собирает ответы по кошелькам: валюта берется из currency_catalog вместо загрузки Wallet.currency,
+    баланс - с учетом несвернутого журнала.
+    """
+    await hydrate_balances(db, wallets)
+    currency_ids = {wallet.currency_id for wallet in wallets}
+    currencies = await currency_catalog.get_many(db, currency_ids)
+    if len(currencies) < len(currency_ids):
+        # валюту могли добавить в другом процессе
+        currency_catalog.invalidate()
+        currencies = await currency_catalog.get_many(db, currency_ids)
+    return [
+        WalletResponse(
+            id=wallet.id,
+            value=wallet.value,
+            description=wallet.description,
+            currency_id=wallet.currency_id,
+            is_general=wallet.is_general,
+            user_id=wallet.user_id,
+            currency=currencies[wallet.currency_id]
+        )
+        for wallet in wallets
+    ]
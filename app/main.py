@@ -1,3 +1,6 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import Depends, FastAPI, Response
 
@@ -8,8 +11,61 @@ from app.api.budget_list.budget_list import router_budget_list
 from app.api.currency.currency import router_currency
 from app.api.income.income import router_income_list
 from app.api.wallet.walet import router_wallet
+from app.database.database import AsyncSessionLocal
+from app.database.replica import ReadYourWritesMiddleware
+from app.helpers.budget_list.ledger_archive import LEDGER_ARCHIVE_AFTER_DAYS, run_ledger_archiver
+from app.helpers.budget_list.ledger_partitions import BUDGET_LIST_PARTITIONED, run_partition_maintenance
+from app.helpers.other.http_client import close_http_client, init_http_client
+from app.helpers.other.ledger_compactor import compact_ledgers, run_ledger_compactor
+from app.helpers.other.rate_refresher import RATE_REFRESH_INTERVAL, run_rate_refresher
+from app.helpers.other.type_catalog import type_catalog
+from app.helpers.update.check_fields import foreign_key_map
+from app.helpers.wallet.balance_index import BALANCE_INDEX_REFRESH_INTERVAL, run_balance_index_refresher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.http_client = init_http_client()
+    foreign_key_map()
+
+    try:
+        async with AsyncSessionLocal() as db:
+            count = await type_catalog.warm(db)
+        print(f"Справочник типов загружен: {count}")
+    except Exception as e:
+        print(f"Ошибка загрузки справочника типов: {e}")
+
+    # без режима журнала дельты wallet_ledger никто не учитывает, поэтому остаток сворачивается при любом режиме
+    try:
+        async with AsyncSessionLocal() as db:
+            compacted = await compact_ledgers(db)
+        if compacted:
+            print(f"Журналы свернуты при старте: {compacted}")
+    except Exception as e:
+        print(f"Ошибка свертки журналов: {e}")
+
+    tasks = []
+    if RATE_REFRESH_INTERVAL > 0:
+        tasks.append(asyncio.create_task(run_rate_refresher(RATE_REFRESH_INTERVAL, app.state.http_client)))
+    # события версий данных пишутся в любом режиме, поэтому компактор работает всегда
+    tasks.append(asyncio.create_task(run_ledger_compactor()))
+    if BUDGET_LIST_PARTITIONED:
+        tasks.append(asyncio.create_task(run_partition_maintenance()))
+    if LEDGER_ARCHIVE_AFTER_DAYS > 0:
+        tasks.append(asyncio.create_task(run_ledger_archiver()))
+    if BALANCE_INDEX_REFRESH_INTERVAL > 0:
+        tasks.append(asyncio.create_task(run_balance_index_refresher()))
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await close_http_client()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ReadYourWritesMiddleware)
 
 
 app.include_router(router)
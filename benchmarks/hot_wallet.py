@@ -0,0 +1,152 @@
+"""
+Пропускная способность создания записей в один "горячий" кошелек - весь путь create_budget.
+
+Каждая операция - отдельная транзакция, как в create_budget/create_income: change_wallet_value
+(расход со списанием и проверкой средств или доход на ту же сумму, чередуются), новая строка
+budget_list, on_entry_created (счетчик, агрегат, индекс балансов, версия данных) и commit.
+Курс не запрашивается, currency_value = 1.
+
+Скрипт запускает себя дважды - с WALLET_LEDGER_MODE=false (UPDATE wallet и upsert строк
+entity_counter и ledger_rollup) и true (журналы дельт, которые сворачивает компактор) -
+и печатает операции в секунду для каждого режима. Созданные записи в конце удаляются
+через on_entries_deleted, баланс кошелька возвращается.
+
+Нужна база из .env и существующий кошелек с балансом не меньше --concurrency * --amount:
+
+    python -m benchmarks.hot_wallet --wallet-id 1 --user-id 1
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+MODES = ("false", "true")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wallet-id", type=int, required=True)
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--expense-type-id", type=int, default=None)
+    parser.add_argument("--income-type-id", type=int, default=None)
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--amount", type=float, default=1.0)
+    parser.add_argument("--run", action="store_true", help="один прогон в текущем режиме (используется внутри)")
+    return parser.parse_args()
+
+
+async def cleanup(args, name: str):
+    from sqlalchemy import delete, func, select
+
+    from app.Models.budget_list.budget_list_alchemy import BudgetList
+    from app.database.database import AsyncSessionLocal
+    from app.helpers.budget_list.ledger_hooks import on_entries_deleted
+    from app.helpers.wallet.change_wallet_value import change_wallet_value
+
+    where = (BudgetList.user_id == args.user_id) & (BudgetList.name == name)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(BudgetList.type_budget, func.count(), func.sum(BudgetList.value))
+            .where(where)
+            .group_by(BudgetList.type_budget)
+        )
+        counts, refund = {}, 0.0
+        for type_budget, count, total in result.all():
+            counts[(args.user_id, type_budget)] = count
+            refund += total if type_budget == "expense" else -total
+        await on_entries_deleted(db, counts, where)
+        await db.execute(delete(BudgetList).where(where))
+        if refund:
+            await change_wallet_value(db, args.wallet_id, args.user_id, refund)
+        await db.commit()
+
+
+async def run_once(args) -> float:
+    from app.Models.budget_list.budget_list_alchemy import BudgetList
+    from app.database.database import AsyncSessionLocal, engine
+    from app.helpers.budget_list.ledger_hooks import on_entry_created
+    from app.helpers.other.ledger_compactor import compact_ledgers, run_ledger_compactor
+    from app.helpers.wallet.change_wallet_value import change_wallet_value
+
+    # лог SQL из database.py искажает замер
+    engine.echo = False
+
+    # по имени записи этого прогона находятся при удалении
+    name = f"hot_wallet {uuid.uuid4().hex[:8]}"
+    queue = asyncio.Queue()
+    for number in range(args.operations):
+        queue.put_nowait("expense" if number % 2 == 0 else "income")
+    failed = 0
+
+    async def create_entry(db, type_budget: str) -> bool:
+        delta = -args.amount if type_budget == "expense" else args.amount
+        value = await change_wallet_value(db, args.wallet_id, args.user_id, delta, check_funds=delta < 0)
+        if value is None:
+            return False
+        entry = BudgetList(
+            name=name,
+            description="",
+            date=datetime.now(timezone.utc),
+            value=args.amount,
+            user_id=args.user_id,
+            type_id=args.expense_type_id if type_budget == "expense" else args.income_type_id,
+            currency_value=1.0,
+            wallet_id=args.wallet_id,
+            type_budget=type_budget
+        )
+        db.add(entry)
+        await on_entry_created(db, entry)
+        return True
+
+    async def worker():
+        nonlocal failed
+        async with AsyncSessionLocal() as db:
+            while not queue.empty():
+                if await create_entry(db, queue.get_nowait()):
+                    await db.commit()
+                else:
+                    failed += 1
+                    await db.rollback()
+
+    # события версий и дельты пишутся в любом режиме, компактор работает в обоих, как в main.py
+    compactor = asyncio.create_task(run_ledger_compactor())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    compactor.cancel()
+    await asyncio.gather(compactor, return_exceptions=True)
+    await cleanup(args, name)
+    async with AsyncSessionLocal() as db:
+        await compact_ledgers(db)
+    await engine.dispose()
+
+    if failed:
+        print(f"отказов (нет средств или кошелька): {failed}", file=sys.stderr)
+    return args.operations / elapsed
+
+
+def main():
+    args = parse_args()
+    if args.run:
+        print(f"{asyncio.run(run_once(args)):.1f}")
+        return
+
+    rates = {}
+    for mode in MODES:
+        env = {**os.environ, "WALLET_LEDGER_MODE": mode, "PYTHONPATH": os.getcwd()}
+        command = [sys.executable, "-m", "benchmarks.hot_wallet", "--run", *sys.argv[1:]]
+        output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+        rates[mode] = float(output.strip().splitlines()[-1])
+        label = "журналы дельт" if mode == "true" else "строки кошелька"
+        print(f"{label:>15}: {rates[mode]:.1f} оп/с ({args.operations} операций, {args.concurrency} параллельно)")
+    print(f"{'ускорение':>15}: x{rates['true'] / rates['false']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Задержка запросов курса: новый httpx.AsyncClient на каждый вызов (как было) против общего клиента
+из http_client.create_http_client с пулом соединений.
+
+Запросы идут в локальный mock-сервер, база и ключ apilayer не нужны:
+
+    python -m benchmarks.http_client --requests 500
+"""
+import argparse
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from app.helpers.other.http_client import create_http_client
+
+
+class QuoteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    body = b'{"success":true,"source":"USD","quotes":{"USDEUR":0.9}}'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    return parser.parse_args()
+
+
+async def per_call_client(url: str, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        async with httpx.AsyncClient() as client:
+            (await client.get(url)).raise_for_status()
+    return (time.perf_counter() - started) / requests * 1000
+
+
+async def shared_client(url: str, requests: int) -> float:
+    client = create_http_client()
+    try:
+        started = time.perf_counter()
+        for _ in range(requests):
+            (await client.get(url)).raise_for_status()
+        return (time.perf_counter() - started) / requests * 1000
+    finally:
+        await client.aclose()
+
+
+async def main():
+    args = parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), QuoteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/live"
+    try:
+        for label, run in (("клиент на вызов", per_call_client), ("общий клиент", shared_client)):
+            print(f"{label:>15}: {await run(url, args.requests):.2f} мс/запрос ({args.requests} запросов)")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
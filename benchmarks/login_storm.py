@@ -0,0 +1,129 @@
+"""
+Задержка дешевого GET во время шквала логинов: bcrypt в пуле потоков (verify_password_async, как сейчас)
+против bcrypt прямо в event loop (как было).
+
+Скрипт поднимает приложение в отдельном процессе uvicorn для каждого режима, шлет --logins запросов
+POST /auth/login по --concurrency параллельно и одновременно по одному запрашивает GET --probe-path.
+Печатает p50/p99 задержки GET и число ответов 503 (очередь bcrypt переполнена).
+
+Нужна база из .env и существующий пользователь:
+
+    python -m benchmarks.login_storm --email user@example.com --password secret
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+MODES = ("pool", "inline")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--probe-path", default="/docs", help="дешевый GET без базы")
+    parser.add_argument("--serve", choices=MODES, help="поднять сервер в режиме (используется внутри)")
+    parser.add_argument("--port", type=int, default=0)
+    return parser.parse_args()
+
+
+def serve(mode: str, port: int):
+    import uvicorn
+
+    import app.api.auth.login as login_module
+    from app.helpers.auth.hashed_password import verify_password
+    from app.main import app
+
+    if mode == "inline":
+        async def verify_inline(plain_password: str, hashed_password: str) -> bool:
+            return verify_password(plain_password, hashed_password)
+
+        login_module.verify_password_async = verify_inline
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_ready(client: httpx.AsyncClient, path: str, timeout: float = 30):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            (await client.get(path)).raise_for_status()
+            return
+        except httpx.TransportError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def storm(args, base_url: str):
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await wait_ready(client, args.probe_path)
+
+        queue = asyncio.Queue()
+        for _ in range(args.logins):
+            queue.put_nowait(None)
+        statuses = []
+
+        async def login_worker():
+            while not queue.empty():
+                queue.get_nowait()
+                response = await client.post(
+                    "/auth/login", json={"email": args.email, "password": args.password}
+                )
+                statuses.append(response.status_code)
+
+        latencies = []
+        workers = asyncio.gather(*(login_worker() for _ in range(args.concurrency)))
+        while not workers.done():
+            started = time.perf_counter()
+            (await client.get(args.probe_path)).raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+        await workers
+        return latencies, statuses
+
+
+def measure(args, mode: str):
+    port = free_port()
+    env = {**os.environ, "PYTHONPATH": os.getcwd()}
+    command = [sys.executable, "-m", "benchmarks.login_storm", *sys.argv[1:], "--serve", mode, "--port", str(port)]
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+    try:
+        return asyncio.run(storm(args, f"http://127.0.0.1:{port}"))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    args = parse_args()
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    for mode in MODES:
+        latencies, statuses = measure(args, mode)
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        label = "пул bcrypt" if mode == "pool" else "bcrypt в loop"
+        print(f"{label:>13}: GET {args.probe_path} p50 {percentiles[49]:.1f} мс, p99 {percentiles[98]:.1f} мс "
+              f"({len(latencies)} замеров; логинов {args.logins} по {args.concurrency}, "
+              f"503: {statuses.count(503)})")
+
+
+if __name__ == "__main__":
+    main()
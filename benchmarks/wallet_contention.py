@@ -0,0 +1,90 @@
+"""
+Конкуренция за один кошелек при записи с запросом курса валют.
+
+Сравниваются две схемы create_budget, курс заменен задержкой --fx-latency (мс) вместо запроса в apilayer:
+
+    lock-during-fx  - SELECT wallet FOR UPDATE, запрос курса под блокировкой, UPDATE, commit (как было);
+    fx-then-update  - запрос курса без блокировок, затем change_wallet_value одним UPDATE ... RETURNING.
+
+Списания и пополнения на одну сумму чередуются, баланс в итоге не меняется. Печатает операции в секунду.
+Нужна база из .env и существующий кошелек с балансом не меньше --concurrency * --amount:
+
+    python -m benchmarks.wallet_contention --wallet-id 1 --user-id 1
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+
+from app.Models.wallet.wallet_model_alchemy import Wallet
+from app.database.database import AsyncSessionLocal, engine
+from app.helpers.wallet.change_wallet_value import change_wallet_value
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wallet-id", type=int, required=True)
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--operations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--amount", type=float, default=1.0)
+    parser.add_argument("--fx-latency", type=float, default=150, help="задержка запроса курса, мс")
+    return parser.parse_args()
+
+
+async def lock_during_fx(db, args, delta: float) -> bool:
+    result = await db.execute(
+        select(Wallet).where(Wallet.id == args.wallet_id, Wallet.user_id == args.user_id).with_for_update()
+    )
+    wallet = result.scalar_one_or_none()
+    await asyncio.sleep(args.fx_latency / 1000)
+    if wallet is None or wallet.value + delta < 0:
+        return False
+    wallet.value += delta
+    return True
+
+
+async def fx_then_update(db, args, delta: float) -> bool:
+    await asyncio.sleep(args.fx_latency / 1000)
+    value = await change_wallet_value(db, args.wallet_id, args.user_id, delta, check_funds=delta < 0)
+    return value is not None
+
+
+async def measure(args, operation) -> float:
+    queue = asyncio.Queue()
+    for number in range(args.operations):
+        queue.put_nowait(-args.amount if number % 2 == 0 else args.amount)
+    failed = 0
+
+    async def worker():
+        nonlocal failed
+        async with AsyncSessionLocal() as db:
+            while not queue.empty():
+                if await operation(db, args, queue.get_nowait()):
+                    await db.commit()
+                else:
+                    failed += 1
+                    await db.rollback()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    if failed:
+        print(f"отказов (нет средств или кошелька): {failed}")
+    return args.operations / elapsed
+
+
+async def main():
+    args = parse_args()
+    # лог SQL из database.py искажает замер
+    engine.echo = False
+    for label, operation in (("lock-during-fx", lock_during_fx), ("fx-then-update", fx_then_update)):
+        rate = await measure(args, operation)
+        print(f"{label:>14}: {rate:.1f} оп/с ({args.operations} операций, {args.concurrency} параллельно, "
+              f"курс {args.fx_latency:.0f} мс)")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
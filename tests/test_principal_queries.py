@@ -0,0 +1,103 @@
+"""
+Количество запросов в базу на один GET /income. База - SQLite в памяти, нужны pytest и aiosqlite:
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+
+os.environ.update(
+    DB_PORT="5432", SECRET_KEY="test", ALGORITHM="HS256", ACCESS_TOKEN_EXPIRE_MINUTES="15", REFRESH_TOKEN_EXPIRE_DAYS="1",
+    RATE_REFRESH_INTERVAL="0", BALANCE_INDEX_REFRESH_INTERVAL="0"
+)
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import MetaData, Table, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.api.deps import get_read_db
+from app.database.base import Base
+from app.database.database import get_db
+from app.helpers.auth.principal_cache import principal_cache
+from app.helpers.auth.token import create_access_token
+from app.main import app
+from app.Models.auth.user import User
+from app.Models.role.role import Role
+
+
+def sqlite_metadata() -> MetaData:
+    """
+    Схема без вычисляемых колонок (search_vector) и индексов Postgres - их SQLite не создаст.
+    """
+    metadata = MetaData()
+    for source in Base.metadata.sorted_tables:
+        Table(source.name, metadata, *(column._copy() for column in source.columns if column.computed is None))
+    return metadata
+
+
+@pytest.fixture(scope="module")
+def client():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as connection:
+            await connection.run_sync(sqlite_metadata().create_all)
+        async with session_factory() as db:
+            db.add(Role(id=1, name="user", value=1, description=1, role="USER"))
+            db.add(User(id=1, name="user", email="user@test.ru", age=1, isactive=True, password="x",
+                        role_id=1, role_version=1))
+            await db.commit()
+
+    async def override_db():
+        async with session_factory() as session:
+            yield session
+
+    asyncio.run(setup())
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_read_db] = override_db
+
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    with TestClient(app) as test_client:
+        test_client.statements = statements
+        yield test_client
+
+    app.dependency_overrides.clear()
+    asyncio.run(engine.dispose())
+
+
+def get_counted(client, path: str, claims: dict):
+    principal_cache.invalidate_user(claims["id"])
+    client.cookies.set("access_token", create_access_token(claims))
+    client.statements.clear()
+    response = client.get(path)
+    return response, list(client.statements)
+
+
+def touches(statements, table: str):
+    return [statement for statement in statements if f"FROM {table}" in statement or f"JOIN {table}" in statement]
+
+
+def test_income_list_resolves_principal_from_claims_without_queries(client):
+    claims = {"id": 1, "email": "user@test.ru", "name": "user", "isactive": True, "role": "USER", "role_version": 1}
+    response, statements = get_counted(client, "/income", claims)
+
+    assert response.status_code == 200
+    assert touches(statements, "users") == []
+    assert touches(statements, "role") == []
+    # версия данных для ETag, счетчик записей, архивный счетчик и сама страница
+    assert len(statements) == 4
+
+
+def test_income_list_loads_user_once_without_role_claims(client):
+    claims = {"id": 1, "email": "user@test.ru", "name": "user", "isactive": True}
+    response, statements = get_counted(client, "/income", claims)
+
+    assert response.status_code == 200
+    assert len(touches(statements, "users")) == 1
+    assert len(statements) == 5